@@ -0,0 +1,19 @@
+"""
+bcrypt成本校准入口
+在部署主机上执行一次, 将输出的成本配置为 BCRYPT_ROUNDS, 所有进程及导入任务使用同一成本
+python -m src.auth.calibrate --target-ms 250
+"""
+
+import argparse
+
+from src.auth.password import benchmark_rounds, calibrate_rounds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="校准bcrypt成本")
+    parser.add_argument("--target-ms", type=float, required=True, help="目标校验耗时")
+    parser.add_argument("--samples", type=int, default=5, help="每个成本的测量次数")
+    args = parser.parse_args()
+    calibrated = calibrate_rounds(args.target_ms, samples=args.samples)
+    verify_ms = benchmark_rounds(calibrated, args.samples)
+    print(f"rounds={calibrated} verify={verify_ms:.1f}ms")
+    print(f"BCRYPT_ROUNDS = {calibrated}")
@@ -29,3 +29,15 @@ token_expired_exception = HTTPException(
     detail="Token已过期",
     headers={"WWW-Authenticate": "Bearer"},
 )
+
+token_revoked_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Token已注销",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+password_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="服务繁忙, 请稍后重试.",
+    headers={"Retry-After": "1"},
+)
@@ -1,3 +1,6 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
 
 import jwt
@@ -10,12 +13,16 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from src.auth.exception import (
     authenticate_exception,
     credentials_exception,
+    inactive_exception,
     no_token_exception,
     token_expired_exception,
+    token_revoked_exception,
 )
 from src.auth.models.user import User
+from src.auth.revocation import token_revocation
+from src.cache import TTLCache
 from src.config import settings
-from src.database.core import async_engine
+from src.database.core import ReadSessionDep
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
@@ -31,23 +38,72 @@ class TokenData(BaseModel):
     """令牌数据模型"""
 
     user_id: int
+    jti: str | None = None
+    exp: int | None = None
 
+    # 以下为携带声明模式下的授权快照
+    username: str | None = None
+    active: bool | None = None
+    department_id: int | None = None
+    sv: int | None = None
 
-async def authenticate_user(username: str, password: str) -> User:
+
+class Principal(BaseModel):
+    """授权主体, 仅包含授权判断所需的信息"""
+
+    id: int
+    username: str
+    active: bool
+    department_id: int | None = None
+
+
+# 已校验令牌缓存, 以令牌摘要为键, 无效令牌也会短暂缓存
+token_cache: TTLCache[str, TokenData | HTTPException] = TTLCache(
+    maxsize=settings.token_cache_maxsize, ttl=settings.token_cache_ttl
+)
+
+
+def token_digest(token: str) -> str:
+    """计算令牌摘要"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+async def authenticate_user(
+    session: AsyncSession, username: str, password: str
+) -> User:
     """
     验证用户凭据
+    :param session: 请求会话
     :param username: 用户名
     :param password: 密码
     :return: 用户对象
     """
-    async with AsyncSession(async_engine) as session:
-        user_db = (
-            await session.exec(select(User).where(User.username == username))
-        ).first()
-        if not user_db:
-            raise authenticate_exception
-        user = User.model_validate(user_db)
-    return await user.check_pwd(password)
+    user_db = (
+        await session.exec(select(User).where(User.username == username))
+    ).first()
+    if not user_db:
+        raise authenticate_exception
+    await user_db.check_pwd(password)
+    await user_db.upgrade_pwd(session, password)
+    return User.model_validate(user_db)
+
+
+def token_claims(user: User) -> dict:
+    """
+    生成令牌声明
+    开启access_token_claims时携带授权快照, 授权依赖可不查询数据库
+    :param user: 用户对象
+    :return: 令牌声明
+    """
+    claims: dict = {"user_id": str(user.id)}
+    if settings.access_token_claims:
+        claims.update(
+            username=user.username,
+            active=user.active,
+            department_id=user.department_id,
+            sv=user.security_version,
+        )
+    return claims
 
 
 async def create_access_token(
@@ -65,6 +121,7 @@ async def create_access_token(
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(
         to_encode,
         settings.access_token_secret_key,
@@ -84,12 +141,29 @@ async def get_token_header(token: str = Depends(oauth2_scheme)) -> str:
     return token
 
 
+async def check_revoked(token_data: TokenData) -> TokenData:
+    """
+    检查令牌是否已注销
+    :param token_data: 令牌数据
+    :return: 令牌数据
+    """
+    if token_data.jti and await token_revocation.is_revoked(token_data.jti):
+        raise token_revoked_exception
+    return token_data
+
+
 async def invalid_token(token: str = Depends(get_token_header)) -> TokenData:
     """
     验证访问令牌
     :param token: 访问令牌
     :return: 令牌数据
     """
+    digest = token_digest(token)
+    cached = token_cache.get(digest)
+    if isinstance(cached, HTTPException):
+        raise cached
+    if cached is not None:
+        return await check_revoked(cached)
     try:
         payload = jwt.decode(
             token,
@@ -97,20 +171,61 @@ async def invalid_token(token: str = Depends(get_token_header)) -> TokenData:
             algorithms=[settings.access_token_algorithm],
         )
     except jwt.ExpiredSignatureError as exc:
+        token_cache.set(
+            digest, token_expired_exception, ttl=settings.token_cache_negative_ttl
+        )
         raise token_expired_exception from exc
     except jwt.InvalidTokenError as exc:
+        token_cache.set(
+            digest, credentials_exception, ttl=settings.token_cache_negative_ttl
+        )
         raise credentials_exception from exc
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e)
         ) from e
-    return TokenData(user_id=payload.get("user_id"))
+    token_data = TokenData.model_validate(payload)
+    # 缓存时间不超过令牌自身的过期时间
+    exp = payload.get("exp")
+    token_cache.set(digest, token_data, ttl=exp - time.time() if exp else None)
+    return await check_revoked(token_data)
 
 
-async def get_current_user(token_data: TokenData = Depends(invalid_token)) -> User:
+async def get_current_user(
+    session: ReadSessionDep, token_data: TokenData = Depends(invalid_token)
+) -> User:
     """
-    获取当前用户
+    获取当前用户, 复用请求会话
+    :param session: 请求会话
     :param token_data: 令牌数据
     :return: 用户对象
     """
-    return await User.get_user(user_id=token_data.user_id)
+    user = await User.get_user(session, user_id=token_data.user_id)
+    if token_data.sv is not None and token_data.sv != user.security_version:
+        raise credentials_exception
+    return user
+
+
+async def get_current_principal(
+    session: ReadSessionDep, token_data: TokenData = Depends(invalid_token)
+) -> Principal:
+    """
+    获取当前授权主体
+    令牌携带声明时不查询数据库, 安全版本低于各进程同步的最低有效版本时拒绝
+    :param session: 请求会话
+    :param token_data: 令牌数据
+    :return: 授权主体
+    """
+    if token_data.sv is None or token_data.username is None:
+        user = await User.get_user(session, user_id=token_data.user_id)
+        return Principal.model_validate(user, from_attributes=True)
+    if token_revocation.is_stale(token_data.user_id, token_data.sv):
+        raise credentials_exception
+    if not token_data.active:
+        raise inactive_exception
+    return Principal(
+        id=token_data.user_id,
+        username=token_data.username,
+        active=token_data.active,
+        department_id=token_data.department_id,
+    )
@@ -1,26 +1,59 @@
-from typing import TYPE_CHECKING
+from typing import Dict, List, Sequence
 
-from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import Index, func, text
+from sqlmodel import Field, Relationship, SQLModel, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.auth.models.user import User, principal_cache
 from src.database.base import TableBase, set_table_name
+from src.database.collection import CollectionVersion
+from src.database.conditional import Version
+from src.database.entity_cache import entity_cache
 from src.database.mixin import AuditMixin
 
-if TYPE_CHECKING:
-    from src.auth.models.user import User
-
 
 class DepartmentBase(SQLModel):
     """部门基础模型"""
 
-    name: str = Field(title="部门名称", unique=True)
-    code: str = Field(title="部门编码", unique=True)
+    name: str = Field(title="部门名称", description="有效部门中唯一")
+    code: str = Field(title="部门编码", description="有效部门中唯一")
 
 
 class Department(TableBase, AuditMixin, DepartmentBase, table=True):
     """部门表"""
 
     __tablename__ = set_table_name("department")
-    __table_args__ = {"comment": "部门表"}
+    __table_args__ = (
+        # 部门名称/编码的前缀及子串搜索
+        Index(
+            "ix_department_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_department_code_trgm",
+            "code",
+            postgresql_using="gin",
+            postgresql_ops={"code": "gin_trgm_ops"},
+        ),
+        # 已删除部门的名称/编码可被重新使用
+        Index(
+            "uq_department_name_active",
+            "name",
+            unique=True,
+            postgresql_where=text("active"),
+        ),
+        Index(
+            "uq_department_code_active",
+            "code",
+            unique=True,
+            postgresql_where=text("active"),
+        ),
+        # 有效部门按id分页
+        Index("ix_department_active", "id", postgresql_where=text("active")),
+        {"comment": "部门表"},
+    )
 
     created_user: "User" = Relationship(
         sa_relationship_kwargs={"foreign_keys": "[Department.create_user_id]"}
@@ -37,3 +70,89 @@ class Department(TableBase, AuditMixin, DepartmentBase, table=True):
         back_populates="department",
         sa_relationship_kwargs={"foreign_keys": "[User.department_id]"},
     )
+
+    @staticmethod
+    async def count_users(
+        session: AsyncSession, department_ids: Sequence[int]
+    ) -> Dict[int, int]:
+        """按部门聚合统计用户数"""
+        if not department_ids:
+            return {}
+        department_id = col(User.department_id)
+        stmt = (
+            select(department_id, func.count())
+            .where(department_id.in_(department_ids))
+            .group_by(department_id)
+        )
+        return {k: v for k, v in (await session.exec(stmt)).all() if k is not None}
+
+    @staticmethod
+    async def first_users(
+        session: AsyncSession, department_ids: Sequence[int], limit: int
+    ) -> Dict[int, List[User]]:
+        """每个部门按ID排序的前limit个用户, 单条窗口函数查询"""
+        if not department_ids:
+            return {}
+        row_number = (
+            func.row_number()
+            .over(partition_by=User.department_id, order_by=User.id)
+            .label("row_number")
+        )
+        ranked = (
+            select(User.id, row_number)
+            .where(col(User.department_id).in_(department_ids))
+            .subquery()
+        )
+        stmt = (
+            select(User)
+            .join(ranked, col(User.id) == ranked.c.id)
+            .where(ranked.c.row_number <= limit)
+            .order_by(User.id)
+            .options(*User.load_options())
+        )
+        users: Dict[int, List[User]] = {id: [] for id in department_ids}
+        for user in (await session.exec(stmt)).all():
+            if user.department_id is not None:
+                users[user.department_id].append(user)
+        return users
+
+    @classmethod
+    async def invalidate_entities(
+        cls, session: AsyncSession, ids: Sequence[int | None]
+    ) -> None:
+        """用户输出及缓存的当前用户中嵌入了所属部门, 部门写入后其用户的缓存一并清除"""
+        await super().invalidate_entities(session, ids)
+        department_ids = [id for id in ids if id is not None]
+        if not department_ids or not (entity_cache.enabled or len(principal_cache)):
+            return
+        stmt = select(User.id).where(col(User.department_id).in_(department_ids))
+        user_ids = (await session.exec(stmt)).all()
+        for user_id in user_ids:
+            principal_cache.pop(user_id)
+        await entity_cache.invalidate(User, *user_ids)
+
+    @staticmethod
+    async def resource_version(session: AsyncSession, id: int) -> Version | None:
+        """
+        部门或其用户的最后修改时间, 用于条件请求
+        用户离开部门不更新剩余成员, 附加成员数量及id之和
+        """
+        stmt = (
+            select(
+                func.greatest(Department.update_dt, func.max(User.update_dt)),
+                func.count(col(User.id)),
+                func.coalesce(func.sum(User.id), 0),
+            )
+            .select_from(Department)
+            .outerjoin(User, col(User.department_id) == Department.id)
+            .where(col(Department.id) == id)
+            .group_by(col(Department.id))
+        )
+        row = (await session.exec(stmt)).first()
+        if row is None:
+            return None
+        modified, count, id_sum = row
+        return Version(modified, f"{count}:{id_sum}")
+
+
+CollectionVersion.track(Department)
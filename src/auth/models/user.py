@@ -1,25 +1,52 @@
+import logging
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Dict, Self, Union
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Self, Sequence, Union
 
-import bcrypt
+from fastapi import HTTPException
 from pydantic import BaseModel, EmailStr, ModelWrapValidatorHandler, model_validator
-from sqlalchemy.exc import IntegrityError
-from sqlmodel import Field, Relationship, SQLModel, select
+from sqlalchemy import Index, func, inspect, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Field, Relationship, SQLModel, col, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.auth.exception import authenticate_exception, inactive_exception
+from src.auth.password import hash_password, password_hasher
+from src.auth.revocation import token_revocation
+from src.cache import TTLCache
+from src.config import settings
 from src.database.base import TableBase, set_table_name
-from src.database.core import async_engine
+from src.database.bulk import (
+    BulkResult,
+    bulk_soft_delete,
+    bulk_update,
+    find_conflicts,
+    insert_rows,
+)
+from src.database.collection import CollectionVersion
+from src.database.conditional import Version
+from src.database.entity_cache import entity_cache
 from src.database.exception import integrityError_exception
+from src.database.scope import active_scope, include_deleted
 
 if TYPE_CHECKING:
     from src.auth.models.department import Department
 
+logger = logging.getLogger(__name__)
+
+# 已认证用户缓存, 以用户ID为键, 用户写入时失效
+principal_cache: "TTLCache[int, User]" = TTLCache(
+    maxsize=settings.principal_cache_maxsize, ttl=settings.principal_cache_ttl
+)
+
+# 变更后需要使已签发令牌失效的字段
+SECURITY_FIELDS = ("username", "department_id", "active", "hashed_password")
+
 
 class UserBase(SQLModel):
     """用户基础模型"""
 
-    username: str = Field(unique=True, title="用户名")
+    username: str = Field(title="用户名", description="有效用户中唯一")
     email: EmailStr | None = None
 
     department_id: int | None = Field(
@@ -58,9 +85,40 @@ class User(TableBase, UserDateBase, table=True):
     """用户表"""
 
     __tablename__ = set_table_name("user")
-    __table_args__ = {"comment": "用户表"}
+    __table_args__ = (
+        # 用户名/邮箱的前缀及子串搜索
+        Index(
+            "ix_user_username_trgm",
+            "username",
+            postgresql_using="gin",
+            postgresql_ops={"username": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_user_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        Index("ix_user_department_id", "department_id"),
+        # 已删除用户的用户名可被重新使用
+        Index(
+            "uq_user_username_active",
+            "username",
+            unique=True,
+            postgresql_where=text("active"),
+        ),
+        # 有效用户按id分页
+        Index("ix_user_active", "id", postgresql_where=text("active")),
+        {"comment": "用户表"},
+    )
 
     hashed_password: str
+    security_version: int = Field(
+        default=0,
+        title="安全版本",
+        description="用户名,部门,状态或密码变更时递增",
+        sa_column_kwargs={"server_default": "0"},
+    )
 
     # roles: list["Role"] = Relationship(
     #     back_populates="users",
@@ -77,16 +135,41 @@ class User(TableBase, UserDateBase, table=True):
 
     async def check_pwd(self, password: str) -> Self:
         """校验密码"""
-        if not bcrypt.checkpw(
-            password.encode("utf-8"), self.hashed_password.encode("utf-8")
-        ):
+        if not await password_hasher.verify(password, self.hashed_password):
             raise authenticate_exception
         return self
 
     @staticmethod
     def hash_pwd(password: str) -> str:
         """哈希密码"""
-        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        return hash_password(password, password_hasher.rounds)
+
+    async def upgrade_pwd(self, session: AsyncSession, password: str) -> Self:
+        """
+        存储的哈希成本低于配置时重新哈希并保存
+        升级失败时回滚并记录日志, 重新加载用户后继续登录
+        """
+        if not password_hasher.needs_rehash(self.hashed_password):
+            return self
+        try:
+            self.hashed_password = await password_hasher.hash(password)
+            await self.session_save(session)
+        except (HTTPException, SQLAlchemyError):
+            logger.warning("password rehash failed, user_id=%s", self.id, exc_info=True)
+            await session.rollback()
+            # 回滚使用户属性过期, 异步会话中不能延迟加载
+            await session.refresh(self)
+        return self
+
+    @classmethod
+    async def from_create(cls, data: Dict[str, Any]) -> Self:
+        """
+        根据创建数据构建用户
+        密码在线程池中哈希, 避免校验器在事件循环中执行bcrypt
+        """
+        data = dict(data)
+        data["hashed_password"] = await password_hasher.hash(data.pop("password"))
+        return cls.model_validate(data)
 
     @model_validator(mode="wrap")
     @classmethod
@@ -94,37 +177,79 @@ class User(TableBase, UserDateBase, table=True):
         cls, data: Any, handler: ModelWrapValidatorHandler[Self]
     ) -> Self:
         """用户模型校验"""
-        if "password" in data:
+        if isinstance(data, dict) and "password" in data:
             data["hashed_password"] = cls.hash_pwd(data["password"])
         return handler(data)
 
     @classmethod
-    async def get_user(cls, user_id: int) -> Self:
-        """根据用户ID获取用户"""
-        async with AsyncSession(async_engine) as session:
-            stmt = select(cls).where(cls.id == user_id, cls.active)
-            user_db = await session.exec(stmt)
-            user_db = user_db.first()  # 获取查询结果
-            if not user_db:
-                raise inactive_exception
-            user = cls.model_validate(user_db)
+    async def get_user(cls, session: AsyncSession, user_id: int) -> Self:
+        """根据用户ID获取用户, 优先读取缓存, 未命中时使用请求会话查询"""
+        cached = principal_cache.get(user_id)
+        if cached is not None:
+            return cached
+        from src.auth.schemas.user import UserOutLinks
+
+        stmt = (
+            select(cls)
+            .where(cls.id == user_id, cls.active)
+            .options(*cls.load_options(UserOutLinks))
+        )
+        user_db = await session.exec(stmt)
+        user_db = user_db.first()  # 获取查询结果
+        if not user_db:
+            raise inactive_exception
+        # 缓存的是脱离会话的副本: 经关系赋值部门会触发反向引用, 把副本加入会话中部门的 users,
+        # 因此先置空部门, 再不经事件设置
+        user = cls.model_validate(user_db, update={"department": None})
+        set_committed_value(user, "department", user_db.department)
+        principal_cache.set(user_id, user)
         return user
 
-    async def session_save(self, session: AsyncSession) -> Self:
+    async def session_save(
+        self, session: AsyncSession, refresh: Sequence[str] = ()
+    ) -> Self:
+        """
+        保存
+        服务端生成的列随 INSERT/UPDATE ... RETURNING 返回, 不再额外查询
+        :param refresh: 保存后需要加载的关系
+        """
+        refresh = [*refresh, *self.stale_relationships()]
+        # 部门输出中嵌入了用户, 用户所属部门(含变更前)的缓存需一并失效
+        department_ids = {
+            self.department_id,
+            *inspect(self).attrs.department_id.history.deleted,
+        }
+        version_changed = inspect(self).attrs.security_version.history.has_changes()
         try:
             session.add(self)
             await session.commit()
-            await session.refresh(self)
+            if refresh:
+                await session.refresh(self, attribute_names=refresh)
         except IntegrityError as e:
             await session.rollback()
             raise integrityError_exception(e.args[0]) from e
+        if self.id is not None:
+            principal_cache.pop(self.id)
+            if version_changed:
+                await token_revocation.revoke_users({self.id: self.security_version})
+        await self.invalidate_cache([self.id], department_ids)
         return self
 
-    async def create(self, session: AsyncSession) -> Self:
+    @staticmethod
+    async def invalidate_cache(
+        user_ids: Iterable[int | None], department_ids: Iterable[int | None]
+    ) -> None:
+        """清除用户及其所属部门的实体缓存"""
+        from src.auth.models.department import Department
+
+        await entity_cache.invalidate(User, *user_ids)
+        await entity_cache.invalidate(Department, *department_ids)
+
+    async def create(self, session: AsyncSession, refresh: Sequence[str] = ()) -> Self:
         """
         创建时设置创建用户, 更新用户
         """
-        return await self.session_save(session)
+        return await self.session_save(session, refresh)
 
     async def update(
         self,
@@ -132,16 +257,123 @@ class User(TableBase, UserDateBase, table=True):
         data: Union[Dict[str, Any], BaseModel],
     ) -> Self:
         """
-        更新时设置更新用户
+        更新时设置更新用户, 安全相关字段变更时递增安全版本
         """
-        self.sqlmodel_update(data)
+        self.apply_update(data)
         return await self.session_save(session)
 
+    def apply_update(self, data: Union[Dict[str, Any], BaseModel]) -> None:
+        """应用更新数据, 安全相关字段变更时递增安全版本"""
+        before = [getattr(self, k) for k in SECURITY_FIELDS]
+        self.sqlmodel_update(data)
+        if before != [getattr(self, k) for k in SECURITY_FIELDS]:
+            self.security_version += 1
+
     async def delete(self, session: AsyncSession) -> None:
         """
         删除时设置删除用户, 删除时间, 并设置有效状态为false
         """
         self.active = False
         self.delete_dt = datetime.now()
+        self.security_version += 1
         await self.session_save(session)
         return None
+
+    @classmethod
+    async def bulk_create(
+        cls, session: AsyncSession, items: List[Dict[str, Any]]
+    ) -> BulkResult:
+        """
+        批量创建用户
+        先查重, 只为未冲突的项哈希密码, 密码按线程池大小分批并行哈希
+        """
+        items = [dict(item) for item in items]
+        results = await find_conflicts(session, cls, items)
+        pending = [i for i in range(len(items)) if i not in results]
+        hashed = await password_hasher.hash_many(
+            [items[i].pop("password") for i in pending]
+        )
+        objs = {
+            i: cls.model_validate({**items[i], "hashed_password": h})
+            for i, h in zip(pending, hashed)
+        }
+        result = await insert_rows(
+            session,
+            cls,
+            {i: obj.model_dump(exclude={"id"}) for i, obj in objs.items()},
+            results,
+        )
+        await cls.invalidate_cache(
+            [], {objs[i.index].department_id for i in result.items if i.ok}
+        )
+        return result
+
+    @classmethod
+    async def bulk_update(
+        cls, session: AsyncSession, items: List[Dict[str, Any]]
+    ) -> BulkResult:
+        """批量更新用户"""
+        stmt = select(cls.department_id).where(
+            col(cls.id).in_([item["id"] for item in items])
+        )
+        departments = set((await session.exec(stmt)).all())
+        result = await bulk_update(
+            session, cls, items, lambda user, data: user.apply_update(data)
+        )
+        await cls._refresh_versions(
+            session, [i.id for i in result.items if i.ok], departments
+        )
+        return result
+
+    @classmethod
+    async def bulk_delete(cls, session: AsyncSession, ids: List[int]) -> BulkResult:
+        """批量删除用户, 并递增安全版本使已签发令牌失效"""
+        result = await bulk_soft_delete(
+            session, cls, ids, {"security_version": cls.security_version + 1}
+        )
+        await cls._refresh_versions(session, [i.id for i in result.items if i.ok])
+        return result
+
+    @classmethod
+    async def _refresh_versions(
+        cls,
+        session: AsyncSession,
+        ids: List[int | None],
+        departments: Iterable[int | None] = (),
+    ) -> None:
+        """
+        批量写入后失效用户缓存, 并广播最新安全版本
+        :param departments: 写入前用户所属部门, 其实体缓存一并失效
+        """
+        if not ids:
+            return
+        # 批量删除后用户已无效, 需包含已删除行
+        stmt = include_deleted(
+            select(cls.id, cls.security_version, cls.department_id).where(
+                col(cls.id).in_(ids)
+            )
+        )
+        rows = (await session.exec(stmt)).all()
+        for user_id, _, _ in rows:
+            principal_cache.pop(user_id)
+        await token_revocation.revoke_users(
+            {user_id: version for user_id, version, _ in rows}
+        )
+        await cls.invalidate_cache(ids, {*departments, *(row[2] for row in rows)})
+
+    @classmethod
+    async def resource_version(cls, session: AsyncSession, id: int) -> Version | None:
+        """用户或其所属部门的最后修改时间, 用于条件请求"""
+        from src.auth.models.department import Department
+
+        stmt = (
+            select(func.greatest(cls.update_dt, Department.update_dt))
+            .outerjoin(Department, col(cls.department_id) == Department.id)
+            .where(col(cls.id) == id)
+        )
+        modified = (await session.exec(stmt)).first()
+        return Version(modified) if modified else None
+
+
+CollectionVersion.track(User)
+active_scope(User)
@@ -0,0 +1,159 @@
+"""
+密码哈希服务模块
+bcrypt计算在线程池中执行(bcrypt计算时会释放GIL), 避免阻塞事件循环
+"""
+
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+import bcrypt
+
+from src.auth.exception import password_busy_exception
+from src.config import settings
+
+T = TypeVar("T")
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """哈希密码(同步)"""
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode(
+        "utf-8"
+    )
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """校验密码(同步)"""
+    return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+
+def hash_rounds(hashed_password: str) -> int:
+    """从哈希值($2b$12$...)中解析bcrypt成本"""
+    return int(hashed_password.split("$")[2])
+
+
+def benchmark_rounds(rounds: int, samples: int = 5) -> float:
+    """测量指定成本下校验一次密码的耗时(毫秒), 取多次测量的中位数"""
+    hashed = hash_password("calibration", rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        verify_password("calibration", hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_rounds(
+    target_ms: float, max_rounds: int = MAX_ROUNDS, samples: int = 5
+) -> int:
+    """
+    在当前主机上测量bcrypt耗时, 返回校验耗时不超过目标的最大成本
+    由校准入口执行一次, 结果配置为 bcrypt_rounds, 各进程使用相同成本
+    :param target_ms: 目标校验耗时(毫秒)
+    :param max_rounds: 成本上限
+    :param samples: 每个成本的测量次数
+    :return: bcrypt成本
+    """
+    rounds = MIN_ROUNDS
+    while rounds < max_rounds:
+        # 成本每加1耗时翻倍, 先估算避免测量超出目标过多的成本
+        if benchmark_rounds(rounds, samples) * 2 > target_ms:
+            break
+        rounds += 1
+    return rounds
+
+
+class PasswordHasher:
+    """
+    异步密码哈希服务
+    排队任务数超过上限时直接返回503, 并记录耗时和队列长度
+    """
+
+    def __init__(self, workers: int, max_queue: int, rounds: int) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor: ThreadPoolExecutor | None = None
+        self.pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """线程池, 首次使用时创建"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hasher"
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise password_busy_exception
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, func, *args
+            )
+        finally:
+            self.pending -= 1
+            elapsed = time.perf_counter() - start
+            self.calls += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    async def hash(self, password: str) -> str:
+        """哈希密码"""
+        return await self._run(hash_password, password, self.rounds)
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """批量哈希密码, 每批不超过线程数, 并行执行"""
+        hashed: list[str] = []
+        for start in range(0, len(passwords), self.workers):
+            batch = passwords[start : start + self.workers]
+            hashed.extend(await asyncio.gather(*(self.hash(p) for p in batch)))
+        return hashed
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """校验密码"""
+        return await self._run(verify_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """存储的哈希成本是否低于当前配置, 只升级不降级"""
+        return hash_rounds(hashed_password) < self.rounds
+
+    def stats(self) -> dict[str, Any]:
+        """运行统计"""
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "max_queue": self.max_queue,
+            "in_flight": min(self.pending, self.workers),
+            "queued": max(self.pending - self.workers, 0),
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "avg_ms": self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max_seconds * 1000,
+        }
+
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+    rounds=settings.bcrypt_rounds,
+)
@@ -0,0 +1,375 @@
+"""
+令牌注销模块
+已注销的jti存储在Redis中(过期时间与令牌一致), 各进程维护本地布隆过滤器并通过订阅同步,
+只有布隆过滤器命中时才查询Redis确认;
+用户安全版本递增时记录该用户最低有效的安全版本(过期时间为令牌有效期), 同样由各进程订阅同步,
+携带声明的令牌不查询数据库即可判断是否因安全版本递增而失效
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+
+from src.cache import get_redis
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+REVOKED_KEY_PREFIX = "revoked:jti:"
+REVOKED_USER_KEY_PREFIX = "revoked:user:"
+REVOKED_CHANNEL = "revoked:jti"
+# 订阅生效后首先产出的消息
+SUBSCRIBED = ""
+# 安全版本消息前缀, 如 user:1=3,2=5; jti 为十六进制, 不会与之混淆
+USER_MESSAGE_PREFIX = "user:"
+
+# 大于已记录的版本时写入, KEYS: 用户键; ARGV: 版本, 过期秒数
+SET_MAX_VERSION = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tonumber(ARGV[1]) > current then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+"""
+
+
+def user_message(versions: dict[int, int]) -> str:
+    """安全版本消息"""
+    return USER_MESSAGE_PREFIX + ",".join(f"{id}={v}" for id, v in versions.items())
+
+
+def parse_user_message(message: str) -> dict[int, int]:
+    """解析安全版本消息"""
+    items = (item.split("=") for item in message[len(USER_MESSAGE_PREFIX) :].split(","))
+    return {int(id): int(version) for id, version in items}
+
+
+class BloomFilter:
+    """布隆过滤器"""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(
+            int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)), 8
+        )
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        """添加元素"""
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item)
+        )
+
+
+class RevocationStore(ABC):
+    """注销记录存储接口"""
+
+    @abstractmethod
+    async def revoke(self, jti: str, ttl: int) -> None:
+        """记录注销的jti并广播"""
+
+    @abstractmethod
+    async def exists(self, jti: str) -> bool:
+        """jti是否已注销"""
+
+    @abstractmethod
+    def revoked(self) -> AsyncIterator[str]:
+        """遍历所有未过期的已注销jti"""
+
+    @abstractmethod
+    async def revoke_users(self, versions: dict[int, int], ttl: int) -> None:
+        """记录用户最低有效的安全版本并广播"""
+
+    @abstractmethod
+    def user_versions(self) -> AsyncIterator[tuple[int, int]]:
+        """遍历所有未过期的用户最低有效安全版本"""
+
+    @abstractmethod
+    def subscribe(self) -> AsyncIterator[str]:
+        """订阅其他进程注销的jti及安全版本消息, 订阅生效后首先产出 SUBSCRIBED"""
+
+
+class RedisRevocationStore(RevocationStore):
+    """基于Redis的注销记录存储"""
+
+    async def revoke(self, jti: str, ttl: int) -> None:
+        redis = get_redis()
+        await redis.set(f"{REVOKED_KEY_PREFIX}{jti}", 1, ex=ttl)
+        await redis.publish(REVOKED_CHANNEL, jti)
+
+    async def exists(self, jti: str) -> bool:
+        return bool(await get_redis().exists(f"{REVOKED_KEY_PREFIX}{jti}"))
+
+    async def revoked(self) -> AsyncIterator[str]:
+        async for key in get_redis().scan_iter(
+            match=f"{REVOKED_KEY_PREFIX}*", count=1000
+        ):
+            yield key.decode("utf-8")[len(REVOKED_KEY_PREFIX) :]
+
+    async def revoke_users(self, versions: dict[int, int], ttl: int) -> None:
+        redis = get_redis()
+        script = redis.register_script(SET_MAX_VERSION)
+        async with redis.pipeline(transaction=False) as pipe:
+            for id, version in versions.items():
+                await script(
+                    keys=[f"{REVOKED_USER_KEY_PREFIX}{id}"],
+                    args=[version, ttl],
+                    client=pipe,
+                )
+            pipe.publish(REVOKED_CHANNEL, user_message(versions))
+            await pipe.execute()
+
+    async def user_versions(self) -> AsyncIterator[tuple[int, int]]:
+        redis = get_redis()
+        keys = [
+            key
+            async for key in redis.scan_iter(
+                match=f"{REVOKED_USER_KEY_PREFIX}*", count=1000
+            )
+        ]
+        for i in range(0, len(keys), 1000):
+            chunk = keys[i : i + 1000]
+            for key, version in zip(chunk, await redis.mget(chunk)):
+                if version is not None:
+                    id = key.decode("utf-8")[len(REVOKED_USER_KEY_PREFIX) :]
+                    yield int(id), int(version)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        async with get_redis().pubsub() as pubsub:
+            await pubsub.subscribe(REVOKED_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "subscribe":
+                    yield SUBSCRIBED
+                elif message["type"] == "message":
+                    yield message["data"].decode("utf-8")
+
+
+class MemoryRevocationStore(RevocationStore):
+    """进程内注销记录存储, 用于测试和单进程部署"""
+
+    def __init__(self) -> None:
+        self._revoked: dict[str, float] = {}
+        self._user_versions: dict[int, tuple[int, float]] = {}
+        self._subscribers: list[asyncio.Queue[str]] = []
+
+    async def revoke(self, jti: str, ttl: int) -> None:
+        self._revoked[jti] = time.time() + ttl
+        for queue in self._subscribers:
+            queue.put_nowait(jti)
+
+    async def exists(self, jti: str) -> bool:
+        expire_at = self._revoked.get(jti)
+        return expire_at is not None and expire_at > time.time()
+
+    async def revoked(self) -> AsyncIterator[str]:
+        now = time.time()
+        for jti, expire_at in list(self._revoked.items()):
+            if expire_at > now:
+                yield jti
+
+    async def revoke_users(self, versions: dict[int, int], ttl: int) -> None:
+        expire_at = time.time() + ttl
+        for id, version in versions.items():
+            current = self._user_versions.get(id)
+            if current is None or version > current[0]:
+                self._user_versions[id] = (version, expire_at)
+        for queue in self._subscribers:
+            queue.put_nowait(user_message(versions))
+
+    async def user_versions(self) -> AsyncIterator[tuple[int, int]]:
+        now = time.time()
+        for id, (version, expire_at) in list(self._user_versions.items()):
+            if expire_at > now:
+                yield id, version
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        self._subscribers.append(queue)
+        try:
+            yield SUBSCRIBED
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.remove(queue)
+
+
+class TokenRevocation:
+    """
+    令牌注销服务
+    本地布隆过滤器未命中即视为未注销, 命中时再查询存储确认;
+    本地保存各用户最低有效的安全版本, 低于该版本的令牌视为失效
+    """
+
+    def __init__(
+        self,
+        store: RevocationStore,
+        capacity: int,
+        error_rate: float,
+        rebuild_interval: float,
+    ) -> None:
+        self.store = store
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.user_versions: dict[int, int] = {}
+        self.confirmations = 0
+        self._tasks: list[asyncio.Task] = []
+        # 订阅后的首次重建已完成(或失败)
+        self._ready = asyncio.Event()
+        # 重建期间收到的消息, 重建完成后重新应用
+        self._pending: list[str] | None = None
+        # 订阅和定时重建共用 _pending, 重建依次执行
+        self._rebuild_lock = asyncio.Lock()
+
+    def _apply(
+        self, message: str, bloom: BloomFilter, user_versions: dict[int, int]
+    ) -> None:
+        if not message.startswith(USER_MESSAGE_PREFIX):
+            bloom.add(message)
+            return
+        for id, version in parse_user_message(message).items():
+            user_versions[id] = max(version, user_versions.get(id, 0))
+
+    def _add(self, message: str) -> None:
+        """应用注销的jti或安全版本消息"""
+        self._apply(message, self.bloom, self.user_versions)
+        if self._pending is not None:
+            self._pending.append(message)
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """
+        注销令牌
+        :param jti: 令牌ID
+        :param expires_at: 令牌过期时间戳
+        """
+        ttl = max(int(math.ceil(expires_at - time.time())), 1)
+        self._add(jti)
+        await self.store.revoke(jti, ttl)
+
+    async def revoke_users(self, versions: dict[int, int]) -> None:
+        """
+        用户安全版本递增后, 使携带更低版本的令牌失效
+        :param versions: 用户ID -> 当前安全版本
+        """
+        if not versions:
+            return
+        self._add(user_message(versions))
+        try:
+            await self.store.revoke_users(
+                versions, settings.access_token_expire_minutes * 60
+            )
+        except Exception:
+            # 写入已提交, 其他进程只能等到令牌过期或重建后才能得知
+            logger.exception("security version broadcast failed, users=%s", versions)
+
+    def is_stale(self, user_id: int, security_version: int) -> bool:
+        """令牌携带的安全版本是否低于用户最低有效版本"""
+        return security_version < self.user_versions.get(user_id, 0)
+
+    async def is_revoked(self, jti: str) -> bool:
+        """令牌是否已注销, 存储不可用时按已注销处理"""
+        if jti not in self.bloom:
+            return False
+        self.confirmations += 1
+        try:
+            return await self.store.exists(jti)
+        except Exception:
+            logger.exception("revocation store unavailable, jti=%s", jti)
+            return True
+
+    async def rebuild(self) -> None:
+        """从存储重建布隆过滤器及安全版本, 丢弃已过期的记录"""
+        async with self._rebuild_lock:
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            user_versions: dict[int, int] = {}
+            self._pending = []
+            try:
+                async for jti in self.store.revoked():
+                    bloom.add(jti)
+                async for id, version in self.store.user_versions():
+                    user_versions[id] = version
+                for message in self._pending:
+                    self._apply(message, bloom, user_versions)
+                self.bloom = bloom
+                self.user_versions = user_versions
+            finally:
+                self._pending = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for message in self.store.subscribe():
+                    if message == SUBSCRIBED:
+                        # 订阅生效后再重建, 重建期间的消息由订阅连接缓存, 重建后依次应用
+                        await self.rebuild()
+                        self._ready.set()
+                    else:
+                        self._add(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("revocation subscription failed, retrying")
+                self._ready.set()
+                await asyncio.sleep(1)
+
+    async def _periodic_rebuild(self) -> None:
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("revocation rebuild failed")
+
+    async def start(self) -> None:
+        """启动订阅和定时重建, 等待订阅后的首次重建完成"""
+        self._ready.clear()
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._periodic_rebuild()),
+        ]
+        await self._ready.wait()
+
+    async def stop(self) -> None:
+        """停止订阅和定时重建"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict[str, int]:
+        """运行统计"""
+        return {
+            "bloom_size": self.bloom.size,
+            "bloom_hash_count": self.bloom.hash_count,
+            "bloom_count": self.bloom.count,
+            "user_versions": len(self.user_versions),
+            "confirmations": self.confirmations,
+        }
+
+
+token_revocation = TokenRevocation(
+    store=(
+        RedisRevocationStore()
+        if settings.revocation_backend == "redis"
+        else MemoryRevocationStore()
+    ),
+    capacity=settings.revocation_bloom_capacity,
+    error_rate=settings.revocation_bloom_error_rate,
+    rebuild_interval=settings.revocation_rebuild_interval,
+)
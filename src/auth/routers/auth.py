@@ -3,8 +3,19 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 
-from src.auth.models.auth import Token, authenticate_user, create_access_token
-from src.auth.models.user import User
+from src.auth.models.auth import (
+    Token,
+    TokenData,
+    authenticate_user,
+    create_access_token,
+    get_current_principal,
+    invalid_token,
+    token_cache,
+    token_claims,
+)
+from src.auth.models.user import User, principal_cache
+from src.auth.password import password_hasher
+from src.auth.revocation import token_revocation
 from src.auth.schemas.user import UserCreate, UserOut
 from src.config import settings
 from src.database.core import SessionDep
@@ -19,25 +30,51 @@ auth_router = APIRouter(
 
 @auth_router.post("/login", response_model=Token)
 async def login_for_access_token(
+    session: SessionDep,
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     """登录获取access token"""
-    user: User = await authenticate_user(form_data.username, form_data.password)
+    user: User = await authenticate_user(
+        session, form_data.username, form_data.password
+    )
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = await create_access_token(
-        data={"user_id": str(user.id)}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
     return Token(access_token=access_token, token_type="bearer")
 
 
+@auth_router.post("/logout")
+async def logout(token_data: TokenData = Depends(invalid_token)):
+    """注销当前access token"""
+    if token_data.jti and token_data.exp:
+        await token_revocation.revoke(token_data.jti, token_data.exp)
+    return {"ok": True}
+
+
 @auth_router.post("/register", response_model=UserOut)
 async def user_register(
     data: UserCreate,
     session: SessionDep,
 ):
     """用户注册"""
-    user = User.model_validate(data.model_dump())
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
-    return user
+    user = await User.from_create(data.model_dump())
+    return await user.create(session)
+
+
+@auth_router.get("/password_hasher", dependencies=[Depends(get_current_principal)])
+async def read_password_hasher_stats():
+    """获取密码哈希线程池统计"""
+    return password_hasher.stats()
+
+
+@auth_router.get("/principal_cache", dependencies=[Depends(get_current_principal)])
+async def read_principal_cache_stats():
+    """获取当前用户缓存统计"""
+    return principal_cache.stats()
+
+
+@auth_router.get("/token_cache", dependencies=[Depends(get_current_principal)])
+async def read_token_cache_stats():
+    """获取token解码缓存统计"""
+    return token_cache.stats()
@@ -1,34 +1,135 @@
-from fastapi import APIRouter, Depends, Query
-from sqlmodel import select
+from typing import Sequence
 
-from src.auth.models.auth import get_current_user
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.auth.models.auth import get_current_principal, get_current_user
 from src.auth.models.department import Department
 from src.auth.models.user import User
 from src.auth.schemas.department import (
+    DepartmentBulkUpdate,
     DepartmentCreate,
     DepartmentOutLinks,
+    DepartmentSearch,
     DepartmentUpdate,
+    UsersEmbed,
 )
-from src.database.core import SessionDep
+from src.auth.schemas.user import UserOut
+from src.config import settings
+from src.database.bulk import BulkResult
+from src.database.collection import collection_cache
+from src.database.conditional import ConditionalGet, IfMatch
+from src.database.core import ReadSessionDep, SessionDep
+from src.database.entity_cache import entity_cache
+from src.database.pagination import Keyset
+from src.database.scope import include_deleted, include_deleted_query
+from src.responses import Batch, ModelResponse, batch_response, serialize
 
 department_router = APIRouter(
     prefix="/department",
     tags=["department"],
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
+)
+
+department_keyset = Keyset(Department.id)
+department_user_keyset = Keyset(User.id)
+department_conditional_get = ConditionalGet(Department, Department.resource_version)
+department_if_match = IfMatch(Department, Department.resource_version, "department_id")
+
+embed_users_query = Query(
+    default="all",
+    description="用户嵌入方式: all全部, first前users_limit个, count仅数量, none不嵌入",
 )
+users_limit_query = Query(default=10, ge=1, le=100, description="嵌入的用户个数")
+
+
+async def embed_department_users(
+    session: AsyncSession,
+    departments: Sequence[Department],
+    embed: UsersEmbed,
+    users_limit: int,
+) -> list[DepartmentOutLinks]:
+    """按嵌入方式组装部门输出, 用户数由聚合查询得到"""
+    ids = [d.id for d in departments if d.id is not None]
+    if embed == "all":
+        return [
+            DepartmentOutLinks.model_validate(d, update={"user_count": len(d.users)})
+            for d in departments
+        ]
+    counts = await Department.count_users(session, ids) if embed != "none" else {}
+    users = (
+        await Department.first_users(session, ids, users_limit)
+        if embed == "first"
+        else {}
+    )
+    return [
+        DepartmentOutLinks.model_validate(
+            d,
+            update={
+                "users": users.get(d.id, []),
+                "user_count": counts.get(d.id, 0) if embed != "none" else None,
+            },
+        )
+        for d in departments
+        if d.id is not None
+    ]
+
+
+def department_load_options(embed: UsersEmbed):
+    """全部嵌入时随部门加载用户, 否则用户单独查询"""
+    if embed == "all":
+        return Department.load_options(DepartmentOutLinks)
+    return Department.load_options(DepartmentOutLinks, users="noload")
 
 
 @department_router.get("/", response_model=list[DepartmentOutLinks])
 async def read_departments(
-    session: SessionDep,
+    session: ReadSessionDep,
     offset: int = 0,
     limit: int = Query(default=100, le=100),
+    cursor: str | None = Query(default=None, description="键集分页游标"),
+    embed_users: UsersEmbed = embed_users_query,
+    users_limit: int = users_limit_query,
+    search: DepartmentSearch = Depends(),
+    deleted: bool = include_deleted_query,
 ):
     """获取多个角色"""
-    departments = (
-        await session.exec(select(Department).offset(offset).limit(limit))
-    ).all()
-    return departments
+
+    async def load() -> Response:
+        stmt = department_keyset.paginate(
+            select(Department)
+            .where(*search.conditions(Department))
+            .options(*department_load_options(embed_users)),
+            offset,
+            limit,
+            cursor,
+        )
+        departments = (await session.exec(include_deleted(stmt, deleted))).all()
+        response = ModelResponse(
+            list[DepartmentOutLinks],
+            await embed_department_users(
+                session, departments, embed_users, users_limit
+            ),
+        )
+        department_keyset.set_next_cursor(response, departments, limit)
+        return response
+
+    return await collection_cache.response(
+        session,
+        (Department, User),
+        (
+            "departments",
+            offset,
+            limit,
+            cursor,
+            embed_users,
+            users_limit,
+            search.model_dump_json(),
+            deleted,
+        ),
+        load,
+    )
 
 
 @department_router.post("/", response_model=DepartmentOutLinks)
@@ -39,19 +140,131 @@ async def create_department(
 ):
     """创建角色"""
     department = Department.model_validate(data)
-    return await department.create(session, current_user)
+    return await department.create(
+        session, current_user, Department.relationship_names(DepartmentOutLinks)
+    )
+
+
+@department_router.post("/bulk", response_model=BulkResult)
+async def bulk_create_departments(
+    session: SessionDep,
+    data: list[DepartmentCreate] = Body(max_length=settings.bulk_max_items),
+    current_user: User = Depends(get_current_user),
+):
+    """批量创建部门"""
+    return await Department.bulk_create(session, data, current_user)
+
+
+@department_router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_departments(
+    session: SessionDep,
+    data: list[DepartmentBulkUpdate] = Body(max_length=settings.bulk_max_items),
+    current_user: User = Depends(get_current_user),
+):
+    """批量更新部门"""
+    return await Department.bulk_update(
+        session,
+        [item.model_dump(exclude_unset=True) for item in data],
+        current_user,
+    )
+
+
+@department_router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_departments(
+    session: SessionDep,
+    ids: list[int] = Query(max_length=settings.bulk_max_items),
+    current_user: User = Depends(get_current_user),
+):
+    """批量删除部门"""
+    return await Department.bulk_delete(session, ids, current_user)
+
+
+@department_router.get("/batch", response_model=Batch[DepartmentOutLinks])
+async def read_departments_batch(
+    session: ReadSessionDep,
+    ids: list[int] = Query(max_length=settings.batch_max_ids),
+    embed_users: UsersEmbed = embed_users_query,
+    users_limit: int = users_limit_query,
+):
+    """按id批量获取部门, 按请求顺序返回, 并列出不存在的id"""
+    ids = list(dict.fromkeys(ids))
+
+    async def load(pending: list[int]) -> dict[int, bytes]:
+        async with entity_cache.fill_session(session) as fill:
+            departments = await Department.get_many(
+                fill, pending, department_load_options(embed_users)
+            )
+            embedded = await embed_department_users(
+                fill, list(departments.values()), embed_users, users_limit
+            )
+        return {
+            department.id: serialize(DepartmentOutLinks, department)
+            for department in embedded
+        }
+
+    found = await entity_cache.get_many(
+        Department, ids, f"DepartmentOutLinks:{embed_users}:{users_limit}", load
+    )
+    return batch_response(ids, found)
 
 
 @department_router.get("/{department_id}", response_model=DepartmentOutLinks)
 async def read_department(
     department_id: int,
-    session: SessionDep,
+    request: Request,
+    session: ReadSessionDep,
+    embed_users: UsersEmbed = embed_users_query,
+    users_limit: int = users_limit_query,
 ):
     """获取单个角色"""
-    return await Department.get_by_id(session, department_id)
 
+    async def load(session: AsyncSession) -> bytes:
+        department = await Department.get_by_id(
+            session, department_id, department_load_options(embed_users)
+        )
+        departments = await embed_department_users(
+            session, [department], embed_users, users_limit
+        )
+        return serialize(DepartmentOutLinks, departments[0])
 
-@department_router.patch("/{department_id}", response_model=DepartmentOutLinks)
+    return await department_conditional_get.response(
+        request,
+        session,
+        department_id,
+        f"DepartmentOutLinks:{embed_users}:{users_limit}",
+        load,
+    )
+
+
+@department_router.get("/{department_id}/users", response_model=list[UserOut])
+async def read_department_users(
+    department_id: int,
+    session: ReadSessionDep,
+    offset: int = 0,
+    limit: int = Query(default=100, le=100),
+    cursor: str | None = Query(default=None, description="键集分页游标"),
+):
+    """分页获取部门用户"""
+    await Department.get_by_id(session, department_id, Department.load_options())
+    stmt = department_user_keyset.paginate(
+        select(User)
+        .where(col(User.department_id) == department_id)
+        .options(*User.load_options(UserOut)),
+        offset,
+        limit,
+        cursor,
+    )
+    users = (await session.exec(stmt)).all()
+    response = ModelResponse(list[UserOut], users)
+    department_user_keyset.set_next_cursor(response, users, limit)
+    return response
+
+
+@department_router.patch(
+    "/{department_id}",
+    response_model=DepartmentOutLinks,
+    dependencies=[Depends(department_if_match)],
+)
 async def update_department(
     department_id: int,
     data: DepartmentUpdate,
@@ -59,7 +272,9 @@ async def update_department(
     current_user: User = Depends(get_current_user),
 ):
     """更新角色"""
-    department = await Department.get_by_id(session, department_id)
+    department = await Department.get_by_id(
+        session, department_id, Department.load_options(DepartmentOutLinks)
+    )
     return await department.update(
         session=session,
         data=data.model_dump(exclude_unset=True),
@@ -74,6 +289,8 @@ async def delete_department(
     current_user: User = Depends(get_current_user),
 ):
     """删除角色"""
-    department = await Department.get_by_id(session, department_id)
+    department = await Department.get_by_id(
+        session, department_id, Department.load_options()
+    )
     await department.delete(session=session, current_user=current_user)
     return {"ok": True}
@@ -1,27 +1,34 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlmodel import select
 
-from src.auth.models.auth import get_current_user
+from src.auth.models.auth import get_current_principal, get_current_user
 from src.auth.models.role import Role
 from src.auth.models.user import User
 from src.auth.schemas.role import RoleCreate, RoleOutLinks, RoleUpdate
-from src.database.core import SessionDep
+from src.database.core import ReadSessionDep, SessionDep
+from src.database.pagination import Keyset
 
 role_router = APIRouter(
     prefix="/role",
     tags=["role"],
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
 
+role_keyset = Keyset(Role.id)
+
 
 @role_router.get("/", response_model=list[RoleOutLinks])
 async def read_roles(
-    session: SessionDep,
+    response: Response,
+    session: ReadSessionDep,
     offset: int = 0,
     limit: int = Query(default=100, le=100),
+    cursor: str | None = Query(default=None, description="键集分页游标"),
 ):
     """获取多个角色"""
-    roles = (await session.exec(select(Role).offset(offset).limit(limit))).all()
+    stmt = role_keyset.paginate(select(Role), offset, limit, cursor)
+    roles = (await session.exec(stmt)).all()
+    role_keyset.set_next_cursor(response, roles, limit)
     return roles
 
 
@@ -38,7 +45,7 @@ async def create_role(
 
 
 @role_router.get("/{role_id}", response_model=RoleOutLinks)
-async def read_role(role_id: int, session: SessionDep):
+async def read_role(role_id: int, session: ReadSessionDep):
     """获取单个角色"""
     return await Role.get_by_id(session, role_id)
 
@@ -1,10 +1,44 @@
-from fastapi import APIRouter, Depends, Query
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+from celery.result import AsyncResult
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from src.auth.models.auth import get_current_user
+from src.auth.models.department import Department
 from src.auth.models.user import User
-from src.auth.schemas.user import UserCreate, UserOutLinks, UserUpdate
-from src.database.core import SessionDep
+from src.auth.schemas.user import (
+    UserBulkUpdate,
+    UserCreate,
+    UserOut,
+    UserOutLinks,
+    UserSearch,
+    UserUpdate,
+)
+from src.auth.tasks.user_import import ImportFormat, import_dir, import_users
+from src.config import settings
+from src.database.bulk import BulkResult
+from src.database.collection import collection_cache
+from src.database.conditional import ConditionalGet, IfMatch
+from src.database.core import ReadSessionDep, SessionDep
+from src.database.export import Exporter, ExportFormat
+from src.database.pagination import Keyset
+from src.database.scope import include_deleted, include_deleted_query
+from src.responses import Batch, ModelResponse, batch_response, serialize
 
 user_router = APIRouter(
     prefix="/users",
@@ -12,6 +46,11 @@ user_router = APIRouter(
     # dependencies=[Depends(get_current_user)],
 )
 
+user_keyset = Keyset(User.id)
+user_exporter = Exporter(User, UserOut, User.update_dt)
+user_conditional_get = ConditionalGet(User, User.resource_version)
+user_if_match = IfMatch(User, User.resource_version, "user_id")
+
 
 @user_router.get("/me", response_model=UserOutLinks)
 async def read_users_me(current_user: User = Depends(get_current_user)):
@@ -21,14 +60,103 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
 
 @user_router.get("/", response_model=list[UserOutLinks])
 async def read_users(
-    session: SessionDep,
+    session: ReadSessionDep,
     offset: int = 0,
     limit: int = Query(default=100, le=100),
+    cursor: str | None = Query(default=None, description="键集分页游标"),
+    search: UserSearch = Depends(),
+    deleted: bool = include_deleted_query,
     current_user: User = Depends(get_current_user),
 ):
     """获取多个用户"""
-    users = (await session.exec(select(User).offset(offset).limit(limit))).all()
-    return users
+    deleted = search.include_deleted(deleted)
+
+    async def load() -> Response:
+        stmt = user_keyset.paginate(
+            select(User)
+            .where(*search.conditions(User))
+            .options(*User.load_options(UserOutLinks)),
+            offset,
+            limit,
+            cursor,
+        )
+        users = (await session.exec(include_deleted(stmt, deleted))).all()
+        response = ModelResponse(list[UserOutLinks], users)
+        user_keyset.set_next_cursor(response, users, limit)
+        return response
+
+    return await collection_cache.response(
+        session,
+        (User, Department),
+        ("users", offset, limit, cursor, search.model_dump_json(), deleted),
+        load,
+    )
+
+
+@user_router.get("/export")
+async def export_users(
+    format: ExportFormat = "ndjson",
+    since: datetime | None = Query(
+        default=None, description="仅导出该时间之后更新的用户"
+    ),
+    search: UserSearch = Depends(),
+    deleted: bool = include_deleted_query,
+    current_user: User = Depends(get_current_user),
+):
+    """流式导出用户, 增量同步时可包含已删除用户"""
+    deleted = search.include_deleted(deleted)
+    stmt = select(User).where(*search.conditions(User))
+    return user_exporter.response(include_deleted(stmt, deleted), format, since)
+
+
+def save_upload(file: UploadFile, path: str) -> None:
+    """上传文件保存到导入目录"""
+    with open(path, "wb") as f:
+        shutil.copyfileobj(file.file, f, 1024 * 1024)
+
+
+def remove_file(path: str) -> None:
+    """删除文件, 文件不存在时忽略"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+@user_router.post("/import", status_code=status.HTTP_202_ACCEPTED)
+async def import_users_file(
+    file: UploadFile,
+    format: ImportFormat | None = Query(
+        default=None, description="默认按文件扩展名判断"
+    ),
+    current_user: User = Depends(get_current_user),
+):
+    """上传CSV/NDJSON文件, 由后台任务导入用户"""
+    if format is None:
+        format = "ndjson" if (file.filename or "").endswith(".ndjson") else "csv"
+    path = os.path.join(import_dir(), f"{uuid.uuid4().hex}.{format}")
+    try:
+        # 打开, 写入, 关闭文件均在线程池中执行, 不阻塞事件循环
+        await run_in_threadpool(save_upload, file, path)
+        result = import_users.delay(path, format)
+    except Exception:
+        # 未能提交任务时删除已上传的文件
+        await run_in_threadpool(remove_file, path)
+        raise
+    return {"task_id": result.id}
+
+
+@user_router.get("/import/{task_id}")
+async def read_import_status(
+    task_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """获取用户导入进度"""
+    result = AsyncResult(task_id, app=import_users.app)
+    info = result.info
+    if isinstance(info, Exception):
+        info = {"error": str(info)}
+    return {"task_id": task_id, "state": result.state, "progress": info}
 
 
 @user_router.post("/", response_model=UserOutLinks)
@@ -38,19 +166,79 @@ async def create_user(
     current_user: User = Depends(get_current_user),
 ):
     """创建用户"""
-    user = User.model_validate(data.model_dump())
-    return await user.create(session)
+    user = await User.from_create(data.model_dump())
+    return await user.create(session, User.relationship_names(UserOutLinks))
+
+
+@user_router.post("/bulk", response_model=BulkResult)
+async def bulk_create_users(
+    session: SessionDep,
+    data: list[UserCreate] = Body(max_length=settings.bulk_max_items),
+    current_user: User = Depends(get_current_user),
+):
+    """批量创建用户"""
+    return await User.bulk_create(session, [item.model_dump() for item in data])
+
+
+@user_router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_users(
+    session: SessionDep,
+    data: list[UserBulkUpdate] = Body(max_length=settings.bulk_max_items),
+    current_user: User = Depends(get_current_user),
+):
+    """批量更新用户"""
+    return await User.bulk_update(
+        session, [item.model_dump(exclude_unset=True) for item in data]
+    )
+
+
+@user_router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_users(
+    session: SessionDep,
+    ids: list[int] = Query(max_length=settings.bulk_max_items),
+    current_user: User = Depends(get_current_user),
+):
+    """批量删除用户"""
+    return await User.bulk_delete(session, ids)
+
+
+@user_router.get("/batch", response_model=Batch[UserOutLinks])
+async def read_users_batch(
+    session: ReadSessionDep,
+    ids: list[int] = Query(max_length=settings.batch_max_ids),
+    current_user: User = Depends(get_current_user),
+):
+    """按id批量获取用户, 按请求顺序返回, 并列出不存在的id"""
+    ids = list(dict.fromkeys(ids))
+    found = await User.get_many_cached(
+        session, ids, UserOutLinks, User.load_options(UserOutLinks)
+    )
+    return batch_response(ids, found)
 
 
 @user_router.get("/{user_id}", response_model=UserOutLinks)
 async def read_user(
-    user_id: int, session: SessionDep, current_user: User = Depends(get_current_user)
+    user_id: int,
+    request: Request,
+    session: ReadSessionDep,
+    current_user: User = Depends(get_current_user),
 ):
     """获取单个用户"""
-    return await User.get_by_id(session, user_id)
+
+    async def load(session: AsyncSession) -> bytes:
+        user = await User.get_by_id(session, user_id, User.load_options(UserOutLinks))
+        return serialize(UserOutLinks, user)
+
+    return await user_conditional_get.response(
+        request, session, user_id, UserOutLinks.__name__, load
+    )
 
 
-@user_router.patch("/{user_id}", response_model=UserOutLinks)
+@user_router.patch(
+    "/{user_id}",
+    response_model=UserOutLinks,
+    dependencies=[Depends(user_if_match)],
+)
 async def update_user(
     user_id: int,
     data: UserUpdate,
@@ -58,7 +246,7 @@ async def update_user(
     current_user: User = Depends(get_current_user),
 ):
     """更新用户"""
-    user = await User.get_by_id(session, user_id)
+    user = await User.get_by_id(session, user_id, User.load_options(UserOutLinks))
     return await user.update(
         session=session,
         data=data.model_dump(exclude_unset=True),
@@ -72,6 +260,6 @@ async def delete_user(
     current_user: User = Depends(get_current_user),
 ):
     """删除用户"""
-    user = await User.get_by_id(session, user_id)
+    user = await User.get_by_id(session, user_id, User.load_options())
     await user.delete(session=session)
     return {"ok": True}
@@ -1,9 +1,10 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal
 
 from sqlmodel import SQLModel
 
 from src.auth.models.department import DepartmentBase
 from src.database.mixin import AuditOutPutMixin
+from src.database.search import SearchBase
 
 if TYPE_CHECKING:
     from src.auth.schemas.user import UserOut
@@ -16,6 +17,12 @@ class DepartmentUpdate(SQLModel):
     code: str | None = None
 
 
+class DepartmentBulkUpdate(DepartmentUpdate):
+    """部门批量更新模型"""
+
+    id: int
+
+
 class DepartmentCreate(DepartmentBase):
     """部门创建模型"""
 
@@ -32,6 +39,11 @@ class DepartmentOutLinks(DepartmentOut, AuditOutPutMixin):
     """部门输出模型，包含关联的用户列表"""
 
     users: list["UserOut"] | None = []
+    user_count: int | None = None
+
+
+# 部门用户嵌入方式: 全部, 前N个, 仅数量, 不嵌入
+UsersEmbed = Literal["all", "first", "count", "none"]
 
 
 # class DepartmentOutLinks(DepartmentOut):
@@ -40,7 +52,7 @@ class DepartmentOutLinks(DepartmentOut, AuditOutPutMixin):
 #     # users: list["UserOut"] | None = []
 
 
-class DepartmentSearch(SQLModel):
+class DepartmentSearch(SearchBase):
     """部门搜索模型"""
 
     name: str | None = None
@@ -1,13 +1,17 @@
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Annotated, Optional
 
-from pydantic import EmailStr
+from pydantic import EmailStr, WithJsonSchema
 from sqlmodel import SQLModel
 
 from src.auth.models.user import UserBase, UserDateBase
+from src.database.search import SearchBase
 
 if TYPE_CHECKING:
     from src.auth.schemas.department import DepartmentOut
 
+# 输出用邮箱: 写入时已按 EmailStr 校验, 输出时不再重复校验(校验开销远大于其余字段), JSON Schema 与 EmailStr 一致
+OutputEmailStr = Annotated[str, WithJsonSchema({"format": "email", "type": "string"})]
+
 
 class UserCreate(UserBase):
     """用户创建模型"""
@@ -27,10 +31,26 @@ class UserUpdate(SQLModel):
     # )
 
 
+class UserBulkUpdate(UserUpdate):
+    """用户批量更新模型"""
+
+    id: int
+
+
+class UserSearch(SearchBase):
+    """用户搜索模型"""
+
+    username: str | None = None
+    email: str | None = None
+    department_id: int | None = None
+    active: bool | None = None
+
+
 class UserOut(UserDateBase):
     """用户输出模型"""
 
     id: int
+    email: OutputEmailStr | None = None
 
 
 class UserOutLinks(UserOut):
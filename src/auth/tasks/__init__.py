@@ -1 +1,2 @@
 from .testa import *
+from .user_import import *
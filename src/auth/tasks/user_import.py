@@ -0,0 +1,229 @@
+"""
+用户导入任务
+逐行解析上传的CSV/NDJSON文件, 按块校验, 线程池哈希密码,
+COPY写入临时暂存表后合并到用户表, 用户名已存在或部门不存在的行跳过
+"""
+
+import csv
+import os
+import tempfile
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Any, Literal
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+from src.auth.models.department import Department
+from src.auth.models.user import User
+from src.auth.password import hash_password
+from src.auth.schemas.user import UserCreate
+from src.config import settings
+from src.database.entity_cache import entity_cache
+from src.workflow.app import app
+
+ImportFormat = Literal["csv", "ndjson"]
+
+COLUMNS = (
+    "username",
+    "email",
+    "department_id",
+    "hashed_password",
+    "active",
+    "create_dt",
+    "update_dt",
+    "security_version",
+)
+
+STAGING_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS user_import_staging (
+    line integer NOT NULL,
+    username varchar NOT NULL,
+    email varchar,
+    department_id integer,
+    hashed_password varchar NOT NULL,
+    active boolean NOT NULL,
+    create_dt timestamp NOT NULL,
+    update_dt timestamp NOT NULL,
+    security_version integer NOT NULL
+)
+"""
+
+MERGE_SQL = f"""
+INSERT INTO "user" ({", ".join(COLUMNS)})
+SELECT {", ".join(f"s.{c}" for c in COLUMNS)}
+FROM user_import_staging s
+LEFT JOIN department d ON d.id = s.department_id AND d.active
+WHERE s.department_id IS NULL OR d.id IS NOT NULL
+ORDER BY s.line
+ON CONFLICT (username) WHERE active DO NOTHING
+RETURNING id, department_id
+"""
+
+# COPY写入不经过ORM, 开启列表缓存时需自行递增用户表的集合版本
+COLLECTION_VERSION_SQL = """
+INSERT INTO collection_version (name, version) VALUES ('user', 1)
+ON CONFLICT (name) DO UPDATE SET version = collection_version.version + 1
+"""
+
+MISSING_DEPARTMENT_SQL = """
+SELECT s.line, s.department_id
+FROM user_import_staging s
+LEFT JOIN department d ON d.id = s.department_id AND d.active
+WHERE s.department_id IS NOT NULL AND d.id IS NULL
+"""
+
+
+def import_dir() -> str:
+    """上传文件目录"""
+    path = settings.user_import_dir or os.path.join(
+        tempfile.gettempdir(), "user_import"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def read_rows(path: str, format: ImportFormat) -> Iterator[tuple[int, Any]]:
+    """逐行读取文件, 返回(行号, 原始数据)"""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {k: v or None for k, v in row.items()}
+        else:
+            for line_num, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield line_num, orjson.loads(line)
+                    except orjson.JSONDecodeError as e:
+                        yield line_num, e
+
+
+def sync_database_url() -> str:
+    """导入使用psycopg同步连接以支持COPY"""
+    url = make_url(settings.database_url).set(drivername="postgresql+psycopg")
+    return url.render_as_string(hide_password=False)
+
+
+class UserImport:
+    """单次导入的状态和统计"""
+
+    def __init__(self, task: Any, rounds: int) -> None:
+        self.task = task
+        self.rounds = rounds
+        self.processed = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors: list[dict[str, Any]] = []
+
+    def error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < settings.user_import_max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def progress(self) -> dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+    def validate(self, chunk: list[tuple[int, Any]]) -> list[tuple[int, UserCreate]]:
+        valid = []
+        for line, data in chunk:
+            if isinstance(data, Exception):
+                self.error(line, str(data))
+                continue
+            try:
+                valid.append((line, UserCreate.model_validate(data)))
+            except ValidationError as e:
+                self.error(line, "; ".join(err["msg"] for err in e.errors()))
+        return valid
+
+    def write(
+        self, conn: Any, users: list[tuple[int, UserCreate]], hashed: list[str]
+    ) -> None:
+        now = datetime.now()
+        with conn.cursor() as cursor:
+            cursor.execute(STAGING_SQL)
+            cursor.execute("TRUNCATE user_import_staging")
+            with cursor.copy(
+                f"COPY user_import_staging (line, {', '.join(COLUMNS)}) FROM STDIN"
+            ) as copy:
+                for (line, user), hashed_password in zip(users, hashed):
+                    copy.write_row(
+                        (
+                            line,
+                            user.username,
+                            user.email,
+                            user.department_id,
+                            hashed_password,
+                            True,
+                            now,
+                            now,
+                            0,
+                        )
+                    )
+            cursor.execute(MISSING_DEPARTMENT_SQL)
+            missing = cursor.fetchall()
+            for line, department_id in missing:
+                self.error(line, f"部门({department_id})不存在")
+            cursor.execute(MERGE_SQL)
+            rows = cursor.fetchall()
+            inserted = len(rows)
+        conn.commit()
+        # COPY写入不经过ORM, 自行清除新用户(可能缓存了404)及其部门的实体缓存
+        entity_cache.invalidate_sync(User, *(id for id, _ in rows))
+        entity_cache.invalidate_sync(Department, *{d for _, d in rows})
+        if inserted and settings.collection_cache:
+            # 提交后单独递增, 不在导入事务中持有版本行锁
+            with conn.cursor() as cursor:
+                cursor.execute(COLLECTION_VERSION_SQL)
+            conn.commit()
+        self.inserted += inserted
+        # 用户名已存在(含文件内重复)的行
+        self.skipped += len(users) - len(missing) - inserted
+
+    def run(self, path: str, format: ImportFormat) -> dict[str, Any]:
+        engine = create_engine(sync_database_url(), poolclass=NullPool)
+        raw = engine.raw_connection()
+        rows = read_rows(path, format)
+        try:
+            with ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers
+            ) as executor:
+                conn = raw.driver_connection
+                while chunk := list(islice(rows, settings.user_import_chunk_size)):
+                    users = self.validate(chunk)
+                    hashed = list(
+                        executor.map(
+                            hash_password,
+                            [user.password for _, user in users],
+                            [self.rounds] * len(users),
+                        )
+                    )
+                    if users:
+                        self.write(conn, users, hashed)
+                    self.processed += len(chunk)
+                    self.task.update_state(state="PROGRESS", meta=self.progress())
+        finally:
+            raw.close()
+            engine.dispose()
+        return self.progress()
+
+
+@app.task(name="import_users", bind=True)
+def import_users(self: Any, path: str, format: ImportFormat) -> dict[str, Any]:
+    """导入用户, 完成后删除上传文件"""
+    try:
+        return UserImport(self, settings.bcrypt_rounds).run(path, format)
+    finally:
+        os.remove(path)
@@ -0,0 +1,128 @@
+"""
+列表接口序列化基准
+使用构造的ORM对象, 对比标准库json, orjson响应类及预构建TypeAdapter路径的耗时,
+并对比输出邮箱按 EmailStr 重复校验与 OutputEmailStr 不校验的耗时
+python -m src.benchmarks.serialization --rows 100 --users 20
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from pydantic import EmailStr, TypeAdapter
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.auth.models.department import Department
+from src.auth.models.user import User
+from src.auth.schemas.user import OutputEmailStr
+from src.main import app
+from src.responses import ModelResponse
+
+
+def make_user(id: int, department: Department | None = None) -> User:
+    user = User(
+        id=id,
+        username=f"user{id}",
+        email=f"user{id}@example.com",
+        hashed_password="x",
+        department_id=department.id if department else None,
+    )
+    set_committed_value(user, "department", department)
+    return user
+
+
+def make_departments(rows: int, users: int) -> list[Department]:
+    creator = make_user(0)
+    departments = []
+    for i in range(rows):
+        department = Department(id=i, name=f"department{i}", code=f"code{i}")
+        set_committed_value(department, "created_user", creator)
+        set_committed_value(
+            department,
+            "users",
+            [make_user(i * users + j + 1) for j in range(users)],
+        )
+        departments.append(department)
+    return departments
+
+
+def make_users(rows: int) -> list[User]:
+    department = Department(id=1, name="department", code="code")
+    return [make_user(i, department) for i in range(rows)]
+
+
+def route(path: str) -> APIRoute:
+    for r in app.routes:
+        if isinstance(r, APIRoute) and r.path == path and "GET" in r.methods:
+            return r
+    raise LookupError(path)
+
+
+def fastapi_path(
+    r: APIRoute,
+    response_class: type[JSONResponse],
+    loop: asyncio.AbstractEventLoop,
+):
+    """与FastAPI处理返回值的路径一致: 校验, 转换为JSON兼容对象, 再由响应类编码"""
+
+    def run(data: Any) -> bytes:
+        content = loop.run_until_complete(
+            serialize_response(
+                field=r.response_field, response_content=data, is_coroutine=True
+            )
+        )
+        return response_class(content).body
+
+    return run
+
+
+def measure(func: Callable[[Any], Any], data: Any, repeat: int) -> float:
+    func(data)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(data)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="列表接口序列化基准")
+    parser.add_argument("--rows", type=int, default=100, help="每页行数")
+    parser.add_argument("--users", type=int, default=20, help="每个部门的用户数")
+    parser.add_argument("--repeat", type=int, default=50, help="重复次数")
+    args = parser.parse_args()
+    loop = asyncio.new_event_loop()
+
+    cases = [
+        ("/department/", make_departments(args.rows, args.users)),
+        ("/users/", make_users(args.rows)),
+    ]
+    for path, data in cases:
+        r = route(path)
+        schema = r.response_model
+        paths = {
+            "json": fastapi_path(r, JSONResponse, loop),
+            "orjson": fastapi_path(r, ORJSONResponse, loop),
+            "model response": lambda data, schema=schema: (
+                ModelResponse(schema, data).body
+            ),
+        }
+        baseline = None
+        for name, func in paths.items():
+            ms = measure(func, data, args.repeat)
+            baseline = baseline or ms
+            print(f"GET {path:<14} {name:<15} {ms:8.2f}ms  x{baseline / ms:.2f}")
+
+    # 部门列表嵌入的全部用户邮箱
+    emails = [f"user{i}@example.com" for i in range(args.rows * args.users)]
+    baseline = None
+    for name, email_type in (
+        ("EmailStr", EmailStr),
+        ("OutputEmailStr", OutputEmailStr),
+    ):
+        adapter = TypeAdapter(list[email_type])
+        ms = measure(adapter.validate_python, emails, args.repeat)
+        baseline = baseline or ms
+        print(f"email x{len(emails):<12} {name:<15} {ms:8.2f}ms  x{baseline / ms:.2f}")
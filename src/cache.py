@@ -0,0 +1,111 @@
+"""
+缓存模块
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Generic, Hashable, TypeVar
+
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+
+from src.config import settings
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_redis: Redis | None = None
+_sync_redis: SyncRedis | None = None
+
+
+def get_redis() -> Redis:
+    """共享的异步Redis客户端, 首次使用时创建"""
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(settings.cache_redis_url or settings.broker_url)
+    return _redis
+
+
+def get_sync_redis() -> SyncRedis:
+    """共享的同步Redis客户端, 用于后台任务等同步代码"""
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = SyncRedis.from_url(
+            settings.cache_redis_url or settings.broker_url
+        )
+    return _sync_redis
+
+
+class TTLCache(Generic[K, V]):
+    """
+    有容量上限和过期时间的LRU缓存
+    超出容量时淘汰最久未使用的条目, 并记录命中/未命中/淘汰次数
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: K) -> V | None:
+        """获取缓存值, 不存在或已过期时返回None"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expire_at, value = item
+            if expire_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """
+        写入缓存值
+        :param ttl: 过期秒数, 默认使用缓存的ttl, 且不会超过缓存的ttl
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        """移除缓存值"""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        """缓存统计"""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
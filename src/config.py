@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,11 +8,91 @@ class Settings(BaseSettings):
 
     # database
     database_url: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_prepared_statement_cache_size: int = 100
+    db_connect_timeout: float = 60
+    db_pool_warmup: int = 0
+
+    # bulk operations
+    bulk_max_items: int = 1000
+    # 按id批量获取的id个数上限
+    batch_max_ids: int = 200
+
+    # user import, 上传文件目录需对worker可见
+    user_import_dir: str | None = None
+    user_import_chunk_size: int = 1000
+    user_import_max_errors: int = 100
+
+    # read replica
+    database_read_url: str | None = None
+    db_read_your_writes_seconds: float = 5
+    db_replica_max_lag_seconds: float = 2
+    db_replica_lag_check_interval: float = 1
 
     # access token
     access_token_secret_key: str
     access_token_algorithm: str
     access_token_expire_minutes: int
+    access_token_claims: bool = False
+
+    # principal cache
+    principal_cache_maxsize: int = 10000
+    principal_cache_ttl: float = 60
+
+    # token cache
+    token_cache_maxsize: int = 10000
+    token_cache_ttl: float = 300
+    token_cache_negative_ttl: float = 10
+
+    # password hashing
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
+    # 由 python -m src.auth.calibrate 校准后配置
+    bcrypt_rounds: int = 12
+
+    # redis, 默认与celery broker相同
+    cache_redis_url: str | None = None
+
+    # entity cache
+    entity_cache: bool = False
+    entity_cache_maxsize: int = 10000
+    entity_cache_ttl: float = 30
+    entity_cache_redis_ttl: int = 300
+    # 缓存未命中时等待其他进程加载的最长时间
+    entity_cache_lock_timeout: float = 2
+    # 实体不存在(404)的结果在进程内缓存的秒数
+    entity_cache_negative_ttl: float = 5
+
+    # collection cache
+    collection_cache: bool = False
+    collection_cache_maxsize: int = 1000
+    # 写入后旧缓存键不再命中, 过期时间仅用于释放内存
+    collection_cache_ttl: float = 300
+
+    # token revocation
+    revocation_backend: Literal["redis", "memory"] = "redis"
+    revocation_bloom_capacity: int = 100000
+    revocation_bloom_error_rate: float = 0.001
+    revocation_rebuild_interval: float = 3600
+
+    # response
+    response_class: Literal["json", "orjson"] = "orjson"
+
+    # sql instrumentation
+    sql_instrumentation: bool = True
+    # 单个请求中同一语句形态执行超过该次数时告警(疑似N+1), 0表示不检测
+    sql_repeat_threshold: int = 10
+
+    # slow query log
+    slow_query_log: bool = False
+    slow_query_threshold_ms: float = 500
+    slow_query_buffer_size: int = 200
+    # 慢查询执行EXPLAIN的采样比例, 0表示不执行
+    slow_query_explain_sample_rate: float = 0.1
 
     # celery
     broker_url: str
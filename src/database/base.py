@@ -1,15 +1,77 @@
-from typing import TYPE_CHECKING, Any, Dict, Self, Tuple, Type, cast
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Literal,
+    Self,
+    Sequence,
+    Tuple,
+    Type,
+    cast,
+    get_args,
+)
 
 from fastapi import HTTPException
+from pydantic import BaseModel
 from pydantic_core import PydanticUndefined
-from sqlalchemy.orm import declared_attr
-from sqlmodel import Field, SQLModel
+from sqlalchemy import ARRAY, Integer, any_, bindparam, inspect
+from sqlalchemy.orm import (
+    declared_attr,
+    joinedload,
+    noload,
+    selectinload,
+)
+from sqlalchemy.orm.interfaces import ORMOption
+from sqlmodel import Field, SQLModel, col, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.main import SQLModelMetaclass
 
+from src.database.entity_cache import entity_cache
+from src.database.scope import INCLUDE_DELETED
+from src.responses import serialize
+
 if TYPE_CHECKING:
     pass
 
+Loader = Literal["noload", "selectin", "joined"]
+
+LOADERS = {"noload": noload, "selectin": selectinload, "joined": joinedload}
+
+
+def nested_schema(annotation: Any) -> Type[BaseModel] | None:
+    """从字段注解(如 list[UserOut] | None)中取出嵌套的输出模型"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in get_args(annotation):
+        schema = nested_schema(arg)
+        if schema is not None:
+            return schema
+    return None
+
+
+@lru_cache(maxsize=None)
+def _load_options(
+    model: Type[SQLModel],
+    schema: Type[BaseModel] | None,
+    overrides: Tuple[Tuple[str, Loader], ...],
+) -> Tuple[ORMOption, ...]:
+    fields = schema.model_fields if schema is not None else {}
+    options: List[ORMOption] = []
+    for name, relationship in inspect(model).relationships.items():
+        loader = dict(overrides).get(name)
+        if loader is None:
+            loader = "selectin" if name in fields else "noload"
+        option = LOADERS[loader](getattr(model, name))
+        if loader != "noload":
+            child = nested_schema(fields[name].annotation) if name in fields else None
+            option = option.options(
+                *_load_options(relationship.mapper.class_, child, ())
+            )
+        options.append(option)
+    return tuple(options)
+
 
 class DescriptionMeta(SQLModelMetaclass):
     """自动将字段描述添加到数据库列注释中"""
@@ -24,7 +86,7 @@ class DescriptionMeta(SQLModelMetaclass):
         new_class = super().__new__(mcs, name, bases, class_dict, **kwargs)
         fields = new_class.model_fields
 
-        # 为所有关系字段添加 {"lazy": "selectin"}
+        # 为所有关系字段添加 {"lazy": "selectin"}, 接口查询通过 load_options 按输出模型覆盖
         for k, field in class_dict.items():
             if getattr(field, "sa_relationship_kwargs", None):
                 sa_relationship_kwargs = field.sa_relationship_kwargs
@@ -61,17 +123,107 @@ class TableBase(SQLModel, metaclass=DescriptionMeta):
     基础表模型
     """
 
+    # INSERT/UPDATE 通过 RETURNING 取回服务端生成的列, 保存后无需再 refresh
+    __mapper_args__ = {"eager_defaults": True}
+
     id: int | None = Field(default=None, primary_key=True)
 
     @classmethod
-    async def get_by_id(cls, session: AsyncSession, id: int) -> Self:
-        db_obj = await session.get(cls, id)
+    def relationship_names(cls, schema: Type[BaseModel]) -> List[str]:
+        """输出模型中包含的关系名, 用于保存后按需刷新关系"""
+        return [
+            name
+            for name in inspect(cls).relationships.keys()
+            if name in schema.model_fields
+        ]
+
+    def stale_relationships(self) -> List[str]:
+        """外键已修改但仍持有旧关联对象的已加载关系, 保存后需刷新"""
+        state = inspect(self)
+        return [
+            name
+            for name, relationship in state.mapper.relationships.items()
+            if name not in state.unloaded
+            and any(
+                state.attrs[column.key].history.has_changes()
+                for column in relationship.local_columns
+                if column.key in state.attrs
+            )
+        ]
+
+    @classmethod
+    def load_options(
+        cls, schema: Type[BaseModel] | None = None, **overrides: Loader
+    ) -> Tuple[ORMOption, ...]:
+        """
+        根据输出模型生成关系加载选项
+        输出模型中包含的关系使用selectin加载(递归到嵌套模型), 其余关系不加载
+        :param schema: 输出模型
+        :param overrides: 按关系名指定加载方式, joined适用于多对一关系
+        """
+        return _load_options(cls, schema, tuple(sorted(overrides.items())))
+
+    @classmethod
+    async def get_by_id(
+        cls,
+        session: AsyncSession,
+        id: int,
+        options: Sequence[ORMOption] = (),
+        include_deleted: bool = False,
+    ) -> Self:
+        """
+        按id查询, 不存在时返回404
+        :param include_deleted: 是否包含已删除行, 默认只查询有效行
+        """
+        db_obj = await session.get(
+            cls,
+            id,
+            options=options,
+            execution_options={INCLUDE_DELETED: include_deleted},
+        )
         if not db_obj:
             raise HTTPException(
                 status_code=404, detail=f"{cls.__name__} > id({id}) not found"
             )
         return db_obj
 
+    @classmethod
+    async def get_many(
+        cls,
+        session: AsyncSession,
+        ids: Sequence[int],
+        options: Sequence[ORMOption] = (),
+    ) -> Dict[int, Self]:
+        """
+        按id批量查询, 单条 WHERE id = ANY(:ids), 不存在的id不在结果中
+        id列表作为单个数组参数绑定, 不同数量的id使用同一条语句
+        """
+        if not ids:
+            return {}
+        ids_param = bindparam("ids", list(ids), type_=ARRAY(Integer))
+        stmt = select(cls).where(col(cls.id) == any_(ids_param)).options(*options)
+        return {obj.id: obj for obj in (await session.exec(stmt)).all() if obj.id}
+
+    @classmethod
+    async def get_many_cached(
+        cls,
+        session: AsyncSession,
+        ids: Sequence[int],
+        schema: Type[BaseModel],
+        options: Sequence[ORMOption] = (),
+    ) -> Dict[int, bytes]:
+        """
+        经实体缓存批量获取序列化后的输出模型, 未命中的id一次查询加载
+        :param schema: 输出模型
+        """
+
+        async def load(pending: List[int]) -> Dict[int, bytes]:
+            async with entity_cache.fill_session(session) as fill:
+                objs = await cls.get_many(fill, pending, options)
+                return {id: serialize(schema, obj) for id, obj in objs.items()}
+
+        return await entity_cache.get_many(cls, ids, schema.__name__, load)
+
 
 def set_table_name(name: str) -> declared_attr:
     """设置表名"""
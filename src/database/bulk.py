@@ -0,0 +1,262 @@
+"""
+批量操作模块
+整批在单个事务中执行, 逐条报告失败原因, 不因单条唯一约束冲突中断整批
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Sequence, TypeVar
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import lazyload
+from sqlmodel import SQLModel, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database.base import TableBase
+from src.database.exception import integrityError_exception
+
+T = TypeVar("T", bound=TableBase)
+
+# 单条INSERT的行数上限, 避免超出数据库参数个数限制
+INSERT_CHUNK_SIZE = 1000
+
+
+class BulkItemResult(SQLModel):
+    """批量操作单项结果"""
+
+    index: int
+    id: int | None = None
+    ok: bool = True
+    error: str | None = None
+
+
+class BulkResult(SQLModel):
+    """批量操作结果"""
+
+    succeeded: int
+    failed: int
+    items: list[BulkItemResult]
+
+    @classmethod
+    def from_items(cls, items: Dict[int, BulkItemResult]) -> "BulkResult":
+        ordered = [items[i] for i in sorted(items)]
+        succeeded = sum(1 for item in ordered if item.ok)
+        return cls(succeeded=succeeded, failed=len(ordered) - succeeded, items=ordered)
+
+
+def unique_fields(model: type[TableBase]) -> list[str]:
+    """模型的单列唯一约束字段"""
+    table: Any = model.__table__  # pyright: ignore[reportAttributeAccessIssue]
+    fields = [c.name for c in table.columns if c.unique]
+    for index in table.indexes:
+        if index.unique and len(index.columns) == 1:
+            fields.extend(c.name for c in index.columns if c.name not in fields)
+    return fields
+
+
+def integrity_detail(error: IntegrityError) -> str:
+    """提取唯一约束冲突详情"""
+    return integrityError_exception(error.args[0]).detail
+
+
+async def find_conflicts(
+    session: AsyncSession, model: type[TableBase], rows: Sequence[Dict[str, Any]]
+) -> Dict[int, BulkItemResult]:
+    """在批次内和数据库中按唯一字段查重, 返回冲突项"""
+    results: Dict[int, BulkItemResult] = {}
+    fields = unique_fields(model)
+
+    for field in fields:
+        seen: set[Any] = set()
+        for i, row in enumerate(rows):
+            if i in results:
+                continue
+            if row[field] in seen:
+                results[i] = BulkItemResult(
+                    index=i, ok=False, error=f"({field})=({row[field]}) 批次内重复"
+                )
+            seen.add(row[field])
+
+    for field in fields:
+        column = col(getattr(model, field))
+        values = [row[field] for i, row in enumerate(rows) if i not in results]
+        if not values:
+            break
+        existing = set(
+            (await session.exec(select(column).where(column.in_(values)))).all()
+        )
+        for i, row in enumerate(rows):
+            if i not in results and row[field] in existing:
+                results[i] = BulkItemResult(
+                    index=i, ok=False, error=f"({field})=({row[field]}) 已存在"
+                )
+    return results
+
+
+async def _insert_chunk(
+    session: AsyncSession,
+    model: type[TableBase],
+    chunk: Sequence[tuple[int, Dict[str, Any]]],
+) -> Dict[int, int | None]:
+    """多行插入, 返回各项插入的id, 唯一约束冲突的项为None"""
+    fields = unique_fields(model)
+    stmt = insert(model).values([row for _, row in chunk]).on_conflict_do_nothing()
+    if not fields:
+        returned = (await session.execute(stmt.returning(col(model.id)))).scalars()
+        return {i: id for (i, _), id in zip(chunk, returned)}
+    key = fields[0]
+    stmt = stmt.returning(col(model.id), getattr(model, key))
+    inserted = {row[1]: row[0] for row in (await session.execute(stmt)).all()}
+    return {i: inserted.get(row[key]) for i, row in chunk}
+
+
+async def insert_rows(
+    session: AsyncSession,
+    model: type[TableBase],
+    rows: Dict[int, Dict[str, Any]],
+    results: Dict[int, BulkItemResult],
+) -> BulkResult:
+    """
+    分块插入已查重的行
+    每块在保存点中以 INSERT ... ON CONFLICT DO NOTHING RETURNING 多行插入,
+    外键/非空等约束失败时回滚该块并逐行以保存点重试, 逐条报告失败原因
+    :param rows: 以批次内序号为键的行
+    :param results: 已确定的结果, 如查重冲突项
+    """
+    pending = sorted(rows.items())
+    for start in range(0, len(pending), INSERT_CHUNK_SIZE):
+        chunk = pending[start : start + INSERT_CHUNK_SIZE]
+        try:
+            async with session.begin_nested():
+                inserted = await _insert_chunk(session, model, chunk)
+        except IntegrityError:
+            inserted = {}
+            for item in chunk:
+                try:
+                    async with session.begin_nested():
+                        inserted.update(await _insert_chunk(session, model, [item]))
+                except IntegrityError as e:
+                    results[item[0]] = BulkItemResult(
+                        index=item[0], ok=False, error=integrity_detail(e)
+                    )
+        for i, id in inserted.items():
+            results[i] = (
+                BulkItemResult(index=i, id=id)
+                if id is not None
+                else BulkItemResult(index=i, ok=False, error="唯一约束冲突")
+            )
+    await session.commit()
+    return BulkResult.from_items(results)
+
+
+async def bulk_insert(
+    session: AsyncSession, model: type[T], objs: Sequence[T]
+) -> BulkResult:
+    """
+    批量插入
+    先在批次内和数据库中查重, 再分块插入, 并发写入导致的冲突及其他约束失败同样逐条报告
+    """
+    rows = [obj.model_dump(exclude={"id"}) for obj in objs]
+    results = await find_conflicts(session, model, rows)
+    return await insert_rows(
+        session,
+        model,
+        {i: row for i, row in enumerate(rows) if i not in results},
+        results,
+    )
+
+
+async def _load(
+    session: AsyncSession, model: type[T], ids: Sequence[int]
+) -> Dict[int, T]:
+    stmt = select(model).where(col(model.id).in_(ids)).options(lazyload("*"))
+    return {obj.id: obj for obj in (await session.exec(stmt)).all() if obj.id}
+
+
+async def bulk_update(
+    session: AsyncSession,
+    model: type[T],
+    items: Sequence[Dict[str, Any]],
+    apply: Callable[[T, Dict[str, Any]], None],
+) -> BulkResult:
+    """
+    批量更新
+    一次查询加载全部对象, 一次提交批量写入; 出现唯一约束冲突时回滚并逐条以保存点重试定位冲突项
+    :param items: 更新数据, 每项须包含id
+    :param apply: 将更新数据应用到对象上
+    """
+    results: Dict[int, BulkItemResult] = {}
+    seen: set[int] = set()
+    for i, item in enumerate(items):
+        if item["id"] in seen:
+            results[i] = BulkItemResult(
+                index=i, id=item["id"], ok=False, error="批次内重复"
+            )
+        seen.add(item["id"])
+
+    objs = await _load(session, model, list(seen))
+    for i, item in enumerate(items):
+        if i not in results and item["id"] not in objs:
+            results[i] = BulkItemResult(
+                index=i, id=item["id"], ok=False, error="不存在"
+            )
+
+    pending = [i for i in range(len(items)) if i not in results]
+
+    def data(i: int) -> Dict[str, Any]:
+        return {k: v for k, v in items[i].items() if k != "id"}
+
+    try:
+        for i in pending:
+            apply(objs[items[i]["id"]], data(i))
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        session.expunge_all()
+        objs = await _load(session, model, [items[i]["id"] for i in pending])
+        for i in pending:
+            try:
+                async with session.begin_nested():
+                    apply(objs[items[i]["id"]], data(i))
+            except IntegrityError as e:
+                results[i] = BulkItemResult(
+                    index=i, id=items[i]["id"], ok=False, error=integrity_detail(e)
+                )
+        await session.commit()
+
+    for i in pending:
+        results.setdefault(i, BulkItemResult(index=i, id=items[i]["id"]))
+    return BulkResult.from_items(results)
+
+
+async def bulk_soft_delete(
+    session: AsyncSession,
+    model: type[T],
+    ids: Sequence[int],
+    values: Dict[str, Any],
+) -> BulkResult:
+    """
+    批量软删除, 单条 UPDATE ... RETURNING
+    :param values: 额外更新的字段, 如删除用户
+    """
+    model_: Any = model
+    stmt = (
+        update(model)
+        .where(col(model.id).in_(ids), model_.active)
+        .values(active=False, delete_dt=datetime.now(), **values)
+        .returning(col(model.id))
+        .execution_options(synchronize_session=False)
+    )
+    deleted = set((await session.execute(stmt)).scalars().all())
+    await session.commit()
+    return BulkResult.from_items(
+        {
+            i: (
+                BulkItemResult(index=i, id=id)
+                if id in deleted
+                else BulkItemResult(index=i, id=id, ok=False, error="不存在或已删除")
+            )
+            for i, id in enumerate(ids)
+        }
+    )
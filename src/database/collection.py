@@ -0,0 +1,182 @@
+"""
+集合版本模块
+每张表维护单调递增的版本号: 写入时记录变更的表(ORM写入由映射器事件, ORM批量语句由 do_orm_execute 事件),
+提交后在同一会话的短事务中递增, 不在请求事务中持有版本行锁, 也不额外占用连接;
+列表接口以 (相关表版本, 分页及过滤参数) 为键缓存序列化后的响应, 任意写入后旧键不再命中, 无需扫描删除
+仅在开启 collection_cache 时安装事件
+"""
+
+import logging
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Sequence
+from typing import Any
+
+from fastapi.responses import Response
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.event import listen
+from sqlalchemy.orm import ORMExecuteState, Session, object_session
+from sqlmodel import Field, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.cache import TTLCache
+from src.config import settings
+from src.database.base import TableBase, set_table_name
+from src.database.core import after_commit_hooks
+from src.database.pagination import NEXT_CURSOR_HEADER
+
+logger = logging.getLogger(__name__)
+
+# 会话中待递增版本的表, 提交后递增, 回滚后丢弃
+CHANGED_KEY = "collection_versions_changed"
+
+# 记录版本的表名
+tracked: set[str] = set()
+
+
+def mark_changed(session: Session | None, name: str) -> None:
+    """记录会话中变更的表"""
+    if session is not None:
+        session.info.setdefault(CHANGED_KEY, set()).add(name)
+
+
+class CollectionVersion(TableBase, table=True):
+    """集合版本表"""
+
+    __tablename__ = set_table_name("collection_version")
+    __table_args__ = {"comment": "集合版本表"}
+
+    name: str = Field(title="表名", unique=True)
+    version: int = Field(default=0, title="版本号")
+
+    @classmethod
+    def bump(cls, connection: Any, names: Iterable[str]) -> None:
+        """递增表版本"""
+        for name in sorted(names):
+            stmt = insert(cls).values(name=name, version=1)
+            connection.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[cls.name],
+                    set_={"version": cls.version + 1},
+                )
+            )
+
+    @classmethod
+    def changed(cls, mapper, connection, target):
+        """
+        :param mapper: the Mapper which is the target of this event
+        :param connection: the Connection being used
+        :param target: the mapped instance being persisted
+        """
+        mark_changed(object_session(target), mapper.local_table.name)
+
+    @classmethod
+    def track(cls, *models: Any) -> None:
+        """记录模型所在表的版本, 未开启列表缓存时不安装事件"""
+        if not settings.collection_cache:
+            return
+        for model in models:
+            tracked.add(model.__tablename__)
+            listen(model, "after_insert", cls.changed)
+            listen(model, "after_update", cls.changed)
+            listen(model, "after_delete", cls.changed)
+
+
+def mark_orm_statement(state: ORMExecuteState) -> None:
+    """ORM批量 INSERT/UPDATE/DELETE 不触发映射器事件, 在执行时记录"""
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and mapper.local_table.name in tracked:
+        mark_changed(state.session, mapper.local_table.name)
+
+
+async def bump_after_commit(session: AsyncSession) -> None:
+    """提交后在同一会话的短事务中递增版本, 失败时旧缓存最长保留到过期"""
+    names = session.sync_session.info.pop(CHANGED_KEY, None)
+    if not names:
+        return
+    try:
+        await session.run_sync(
+            lambda sync_session: CollectionVersion.bump(
+                sync_session.connection(), names
+            )
+        )
+        await session.commit()
+    except Exception:
+        logger.exception("collection version bump failed, tables=%s", names)
+        await session.rollback()
+
+
+def discard_changed(session: Session, *args: Any) -> None:
+    """回滚后丢弃记录"""
+    session.info.pop(CHANGED_KEY, None)
+
+
+if settings.collection_cache:
+    listen(Session, "do_orm_execute", mark_orm_statement)
+    after_commit_hooks.append(bump_after_commit)
+    listen(Session, "after_rollback", discard_changed)
+
+
+async def collection_versions(
+    session: AsyncSession, names: Sequence[str]
+) -> tuple[int, ...]:
+    """查询表版本, 未写入过的表版本为0"""
+    stmt = select(CollectionVersion.name, CollectionVersion.version).where(
+        col(CollectionVersion.name).in_(names)
+    )
+    versions = dict((await session.exec(stmt)).all())
+    return tuple(versions.get(name, 0) for name in names)
+
+
+class CollectionCache:
+    """
+    列表响应缓存
+    缓存键包含响应所涉及各表的版本, 每次请求只需一次主键查询取得版本
+    """
+
+    def __init__(self, enabled: bool, maxsize: int, ttl: float) -> None:
+        self.enabled = enabled
+        self.local: TTLCache[Hashable, tuple[bytes, str | None]] = TTLCache(
+            maxsize, ttl
+        )
+
+    async def response(
+        self,
+        session: AsyncSession,
+        models: Sequence[Any],
+        params: Hashable,
+        load: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        """
+        获取列表响应, 未命中时加载并缓存
+        :param models: 响应涉及的模型, 如用户列表嵌入部门时为 (User, Department)
+        :param params: 分页及过滤参数
+        :param load: 生成响应
+        """
+        if not self.enabled:
+            return await load()
+        names = tuple(model.__tablename__ for model in models)
+        key = (names, await collection_versions(session, names), params)
+        cached = self.local.get(key)
+        if cached is not None:
+            body, cursor = cached
+            response = Response(body, media_type="application/json")
+            if cursor is not None:
+                response.headers[NEXT_CURSOR_HEADER] = cursor
+            return response
+        response = await load()
+        self.local.set(
+            key, (bytes(response.body), response.headers.get(NEXT_CURSOR_HEADER))
+        )
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        """缓存统计"""
+        return {"enabled": self.enabled, **self.local.stats()}
+
+
+collection_cache = CollectionCache(
+    enabled=settings.collection_cache,
+    maxsize=settings.collection_cache_maxsize,
+    ttl=settings.collection_cache_ttl,
+)
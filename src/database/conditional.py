@@ -0,0 +1,208 @@
+"""
+条件请求模块
+单资源接口根据id和资源版本(最后修改时间及附加状态)生成强ETag及Last-Modified,
+GET 通过 If-None-Match / If-Modified-Since 返回304, PATCH 通过 If-Match 防止丢失更新;
+GET 的校验值与响应体一同经实体缓存读取, 命中时不查询数据库, 返回的ETag总是对应返回的响应体
+ETag 形如 "<资源版本摘要>.<输出形式摘要>", If-Match 只比较资源版本部分
+"""
+
+import hashlib
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, NamedTuple, cast
+
+from fastapi import HTTPException, Request, Response, status
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database.core import SessionDep
+from src.database.entity_cache import entity_cache
+
+
+class Version(NamedTuple):
+    """
+    资源版本
+    :param modified: 最后修改时间
+    :param state: 最后修改时间无法反映的状态, 如部门成员的数量及id之和
+    """
+
+    modified: datetime
+    state: str = ""
+
+
+# 根据id查询资源版本, 资源不存在时返回None
+VersionQuery = Callable[[AsyncSession, int], Awaitable[Version | None]]
+
+# 在给定会话中加载资源并返回序列化结果
+BodyLoader = Callable[[AsyncSession], Awaitable[bytes]]
+
+# 实体缓存中条件GET的字段后缀, 与批量接口缓存的纯响应体区分
+CONDITIONAL_FIELD_SUFFIX = ":conditional"
+
+precondition_failed_exception = HTTPException(
+    status_code=status.HTTP_412_PRECONDITION_FAILED,
+    detail="资源已被修改",
+)
+
+
+def make_etag(id: int, version: Version, variant: str = "") -> str:
+    """强ETag, variant 区分同一资源的不同输出形式"""
+    digest = hashlib.sha1(
+        f"{id}:{version.modified.isoformat()}:{version.state}".encode()
+    ).hexdigest()[:20]
+    if variant:
+        digest += "." + hashlib.sha1(variant.encode()).hexdigest()[:8]
+    return f'"{digest}"'
+
+
+def http_date(modified: datetime) -> str:
+    """HTTP日期, 无时区的时间按本地时间处理"""
+    return format_datetime(modified.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 头中是否包含ETag, 弱比较"""
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def etag_matches_strong(header: str, etag: str) -> bool:
+    """If-Match 头中是否有与资源版本一致的ETag, 强比较, 弱ETag不匹配"""
+    tags = [tag.strip() for tag in header.split(",")]
+    if "*" in tags:
+        return True
+    return any(
+        tag.startswith('"') and tag.strip('"').split(".", 1)[0] == etag.strip('"')
+        for tag in tags
+    )
+
+
+def not_modified(request: Request, etag: str, modified: datetime) -> bool:
+    """是否满足304条件, If-None-Match 优先于 If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return modified.astimezone(timezone.utc).replace(microsecond=0) <= since
+
+
+def validator_headers(etag: str, modified: datetime | None) -> dict[str, str]:
+    """ETag / Last-Modified 响应头"""
+    headers = {"ETag": etag} if etag else {}
+    if modified is not None:
+        headers["Last-Modified"] = http_date(modified)
+    return headers
+
+
+def pack(etag: str, modified: datetime | None, body: bytes) -> bytes:
+    """校验值与响应体打包为一个缓存值, 序列化的JSON不含换行"""
+    header = f"{etag}\n{modified.isoformat() if modified else ''}\n"
+    return header.encode() + body
+
+
+def unpack(value: bytes) -> tuple[str, datetime | None, bytes]:
+    """拆分缓存值为 ETag, 最后修改时间, 响应体"""
+    etag, modified, body = value.split(b"\n", 2)
+    return (
+        etag.decode(),
+        datetime.fromisoformat(modified.decode()) if modified else None,
+        body,
+    )
+
+
+class ConditionalGet:
+    """
+    单资源GET条件请求
+    校验值与响应体一同缓存, 设置 ETag / Last-Modified 响应头, 资源未修改时直接返回304
+    :param model: 资源模型
+    :param version: 资源版本查询
+    """
+
+    def __init__(self, model: Any, version: VersionQuery) -> None:
+        self.model = model
+        self.version = version
+
+    async def response(
+        self,
+        request: Request,
+        session: AsyncSession,
+        id: int,
+        field: str,
+        load: BodyLoader,
+    ) -> Response:
+        """
+        获取资源响应
+        命中缓存时不查询数据库; 未命中(或未开启缓存)时先查版本,
+        满足条件时直接返回304, 不加载关系也不序列化响应体
+        :param field: 输出形式, 如 UserOutLinks, 同时区分ETag
+        :param load: 未命中时加载响应体
+        """
+        cache_field = field + CONDITIONAL_FIELD_SUFFIX
+        value = await entity_cache.peek(self.model, id, cache_field)
+        if value is not None:
+            return self._response(request, *unpack(value))
+
+        async with entity_cache.fill_session(session) as fill_session:
+            # 先查版本再加载响应体, 并发写入时ETag不会比响应体新
+            version = await self.version(fill_session, id)
+            etag = make_etag(id, version, field) if version else ""
+            modified = version.modified if version else None
+            if modified is not None and not_modified(request, etag, modified):
+                raise HTTPException(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers=validator_headers(etag, modified),
+                )
+
+            async def fill() -> bytes:
+                return pack(etag, modified, await load(fill_session))
+
+            value = await entity_cache.get(self.model, id, cache_field, fill)
+        return self._response(request, *unpack(cast(bytes, value)))
+
+    @staticmethod
+    def _response(
+        request: Request, etag: str, modified: datetime | None, body: bytes
+    ) -> Response:
+        headers = validator_headers(etag, modified)
+        if modified is not None and not_modified(request, etag, modified):
+            raise HTTPException(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+        return Response(body, media_type="application/json", headers=headers)
+
+
+class IfMatch:
+    """
+    PATCH等写操作的 If-Match 依赖
+    请求携带 If-Match 时在请求的事务中锁定资源行(SELECT ... FOR UPDATE)后比较,
+    与资源当前版本不一致时返回412, 锁持有到接口提交, 并发写入无法在比较后插入; 未携带时不校验
+    :param model: 资源模型
+    :param version: 资源版本查询
+    :param id_param: 路径中的资源id参数名
+    """
+
+    def __init__(self, model: Any, version: VersionQuery, id_param: str) -> None:
+        self.model = model
+        self.version = version
+        self.id_param = id_param
+
+    async def __call__(self, request: Request, session: SessionDep) -> None:
+        if_match = request.headers.get("if-match")
+        if if_match is None:
+            return
+        id = int(request.path_params[self.id_param])
+        stmt = select(self.model.id).where(col(self.model.id) == id).with_for_update()
+        if (await session.exec(stmt)).first() is None:
+            return
+        version = await self.version(session, id)
+        if version is None:
+            return
+        if not etag_matches_strong(if_match, make_etag(id, version)):
+            raise precondition_failed_exception
@@ -2,26 +2,181 @@
 数据库核心模块
 """
 
-from collections.abc import AsyncGenerator
-from typing import Annotated
+import asyncio
+import hashlib
+import logging
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import Annotated, Any
 
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.cache import TTLCache
 from src.config import settings
 
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+def make_async_engine(url: str) -> AsyncEngine:
+    """根据连接池配置创建异步引擎"""
+    return create_async_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+            "timeout": settings.db_connect_timeout,
+        },
+    )
+
+
+# 提交成功后依次执行的异步回调, 在同一会话中运行;
+# 连接在提交时已归还连接池, 回调再次查询时重新取得, 不会同时占用两个连接
+after_commit_hooks: list[Callable[[AsyncSession], Awaitable[None]]] = []
+
+
+class HookedAsyncSession(AsyncSession):
+    """提交后执行 after_commit_hooks 的异步会话"""
+
+    async def commit(self) -> None:
+        await super().commit()
+        for hook in after_commit_hooks:
+            await hook(self)
+
+
 database_url: str = settings.database_url
-async_engine = create_async_engine(database_url)
+async_engine = make_async_engine(database_url)
 async_session_maker = async_sessionmaker(
-    async_engine, expire_on_commit=False, class_=AsyncSession
+    async_engine, expire_on_commit=False, class_=HookedAsyncSession
+)
+
+# 只读副本, 未配置时与主库相同
+read_async_engine = (
+    make_async_engine(settings.database_read_url)
+    if settings.database_read_url
+    else async_engine
 )
+read_session_maker = async_sessionmaker(
+    read_async_engine, expire_on_commit=False, class_=AsyncSession
+)
+
+# 最近发生写请求的客户端, 窗口期内的读请求路由到主库以读到自己的写入
+recent_writers: TTLCache[str, bool] = TTLCache(
+    maxsize=100000, ttl=settings.db_read_your_writes_seconds
+)
+
 
+class ReplicaMonitor:
+    """
+    副本延迟检测
+    按间隔查询副本回放延迟, 超过上限时读请求回退到主库
+    """
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    """异步数据库会话依赖"""
+    def __init__(self, max_lag: float, interval: float) -> None:
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: float | None = None
+        self._healthy = True
+        self._checked_at = 0.0
+
+    async def healthy(self) -> bool:
+        """副本是否可用"""
+        now = time.monotonic()
+        if now - self._checked_at < self.interval:
+            return self._healthy
+        self._checked_at = now
+        try:
+            async with read_async_engine.connect() as connection:
+                lag = (await connection.execute(text(REPLICA_LAG_SQL))).scalar()
+            self.lag = float(lag or 0)
+            self._healthy = self.lag <= self.max_lag
+        except Exception:
+            logger.warning("replica lag check failed", exc_info=True)
+            self._healthy = False
+        return self._healthy
+
+
+replica_monitor = ReplicaMonitor(
+    max_lag=settings.db_replica_max_lag_seconds,
+    interval=settings.db_replica_lag_check_interval,
+)
+
+
+def writer_key(request: Request) -> str | None:
+    """以认证头区分客户端"""
+    authorization = request.headers.get("Authorization")
+    if authorization:
+        return hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+    return request.client.host if request.client else None
+
+
+async def warm_up_pool(engine: AsyncEngine, size: int) -> None:
+    """
+    预先建立连接, 避免冷启动时的连接风暴
+    :param engine: 异步引擎
+    :param size: 连接数, 不超过连接池大小
+    """
+    size = min(size, settings.db_pool_size)
+    connections = await asyncio.gather(*(engine.connect().start() for _ in range(size)))
+    await asyncio.gather(*(connection.close() for connection in connections))
+
+
+def pool_status(engine: AsyncEngine) -> dict[str, Any]:
+    """连接池实时状态"""
+    pool: Any = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.db_max_overflow,
+        "status": pool.status(),
+    }
+
+
+async def get_async_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """异步数据库会话依赖(主库)"""
+    if request.method not in SAFE_METHODS and (key := writer_key(request)):
+        recent_writers.set(key, True)
     async with async_session_maker() as session:
         yield session
 
 
 SessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
+
+async def get_read_async_session(
+    request: Request, session: SessionDep
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    异步只读会话依赖
+    安全方法的请求路由到副本; 写请求, 写后窗口期内的读请求和副本延迟过大时使用主库会话
+    """
+    if (
+        read_async_engine is async_engine
+        or request.method not in SAFE_METHODS
+        or ((key := writer_key(request)) and recent_writers.get(key))
+        or not await replica_monitor.healthy()
+    ):
+        yield session
+        return
+    async with read_session_maker() as read_session:
+        yield read_session
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_async_session)]
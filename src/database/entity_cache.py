@@ -0,0 +1,383 @@
+"""
+实体缓存模块
+两级读穿缓存: 进程内LRU在前, Redis在后, 缓存序列化后的输出模型
+写入时递增实体版本, 删除Redis中的实体并通过订阅通知其他进程清除本地缓存;
+回源在开启缓存时使用主库会话, 写回Redis前校验版本, 加载期间发生失效时不写回;
+同一实体未命中时进程内合并加载, 进程间通过Redis锁避免同时回源;
+实体不存在(404)的结果在进程内短暂缓存
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.cache import TTLCache, get_redis, get_sync_redis
+from src.config import settings
+from src.database.core import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+ENTITY_KEY_PREFIX = "entity:"
+LOCK_KEY_PREFIX = "entity-lock:"
+VERSION_KEY_PREFIX = "entity-version:"
+INVALIDATE_CHANNEL = "entity:invalidate"
+
+# 加载实体并返回序列化结果, 实体不存在时返回None
+Loader = Callable[[], Awaitable[bytes | None]]
+
+# 按id批量加载实体并返回序列化结果, 不存在的id不在结果中
+ManyLoader = Callable[[list[int]], Awaitable[dict[int, bytes]]]
+
+# 版本未变化时写回实体并删除加载锁, KEYS: 实体, 版本, 锁; ARGV: 加载前的版本, 字段, 值, 过期秒数
+SET_IF_VERSION = """
+local version = redis.call('GET', KEYS[2]) or '0'
+if version == ARGV[1] then
+    redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+redis.call('DEL', KEYS[3])
+return version == ARGV[1]
+"""
+
+
+def entity_key(model: Any, id: int) -> str:
+    """实体键, 如 user:1"""
+    return f"{model.__tablename__}:{id}"
+
+
+class EntityCache:
+    """
+    两级实体缓存
+    同一实体的不同输出形式(输出模型, 查询参数)以字段区分, 失效时一并清除
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        maxsize: int,
+        ttl: float,
+        redis_ttl: int,
+        lock_timeout: float,
+        negative_ttl: float,
+    ) -> None:
+        self.enabled = enabled
+        self.redis_ttl = redis_ttl
+        self.lock_timeout = lock_timeout
+        self.local: TTLCache[str, dict[str, bytes]] = TTLCache(maxsize, ttl)
+        self.missing: TTLCache[str, HTTPException] = TTLCache(maxsize, negative_ttl)
+        self.redis_hits = 0
+        self.loads = 0
+        self._inflight: dict[tuple[str, str], asyncio.Future[bytes | None]] = {}
+        self._task: asyncio.Task | None = None
+        # 失效计数, 加载期间发生过失效时不写入本地缓存
+        self._generation = 0
+
+    def _set_local(self, key: str, field: str, value: bytes, generation: int) -> None:
+        if generation != self._generation:
+            return
+        fields = self.local.get(key) or {}
+        self.local.set(key, {**fields, field: value})
+
+    async def _set_shared(
+        self, key: str, field: str, value: bytes, version: bytes | None, pipe: Any
+    ) -> None:
+        """加载前读到的版本未变化时写回Redis"""
+        await get_redis().register_script(SET_IF_VERSION)(
+            keys=[
+                ENTITY_KEY_PREFIX + key,
+                VERSION_KEY_PREFIX + key,
+                LOCK_KEY_PREFIX + key + ":" + field,
+            ],
+            args=[version or b"0", field, value, self.redis_ttl],
+            client=pipe,
+        )
+
+    @asynccontextmanager
+    async def fill_session(self, session: AsyncSession) -> AsyncIterator[AsyncSession]:
+        """
+        回源会话
+        开启缓存时使用主库会话, 避免副本延迟的旧数据写入共享缓存; 未开启时使用请求的会话
+        """
+        if not self.enabled:
+            yield session
+            return
+        async with async_session_maker() as primary:
+            yield primary
+
+    async def get(self, model: Any, id: int, field: str, load: Loader) -> bytes | None:
+        """
+        读穿获取
+        :param field: 输出形式, 如 UserOutLinks
+        :param load: 未命中时的加载函数
+        """
+        if not self.enabled:
+            return await load()
+        key = entity_key(model, id)
+        fields = self.local.get(key)
+        if fields is not None and field in fields:
+            return fields[field]
+        missing = self.missing.get(key)
+        if missing is not None:
+            raise missing
+        inflight = self._inflight.get((key, field))
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        future: asyncio.Future[bytes | None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._inflight[(key, field)] = future
+        generation = self._generation
+        try:
+            value = await self._get_shared(key, field, load)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            if (
+                isinstance(e, HTTPException)
+                and e.status_code == status.HTTP_404_NOT_FOUND
+                and generation == self._generation
+            ):
+                self.missing.set(key, e)
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._inflight[(key, field)]
+
+    async def _get_shared(self, key: str, field: str, load: Loader) -> bytes | None:
+        generation = self._generation
+        try:
+            redis = get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hget(ENTITY_KEY_PREFIX + key, field)
+                pipe.get(VERSION_KEY_PREFIX + key)
+                value, version = await pipe.execute()
+            if value is None:
+                # 其他进程正在加载时等待其结果, 超时后自行加载
+                lock = LOCK_KEY_PREFIX + key + ":" + field
+                acquired = await redis.set(
+                    lock, 1, nx=True, px=int(self.lock_timeout * 1000)
+                )
+                deadline = asyncio.get_running_loop().time() + self.lock_timeout
+                while not acquired and asyncio.get_running_loop().time() < deadline:
+                    await asyncio.sleep(0.05)
+                    value = await redis.hget(ENTITY_KEY_PREFIX + key, field)
+                    if value is not None:
+                        break
+                    # 加载方失败时已释放锁, 由本进程接替加载
+                    acquired = await redis.set(
+                        lock, 1, nx=True, px=int(self.lock_timeout * 1000)
+                    )
+        except Exception:
+            logger.warning("entity cache unavailable, key=%s", key, exc_info=True)
+            return await load()
+
+        if value is not None:
+            self.redis_hits += 1
+            self._set_local(key, field, value, generation)
+            return value
+
+        self.loads += 1
+        try:
+            value = await load()
+        except BaseException:
+            await self._release(key, field)
+            raise
+        if value is None:
+            await self._release(key, field)
+            return None
+        self._set_local(key, field, value, generation)
+        try:
+            await self._set_shared(key, field, value, version, None)
+        except Exception:
+            logger.warning("entity cache write failed, key=%s", key, exc_info=True)
+        return value
+
+    async def _release(self, key: str, field: str) -> None:
+        """加载失败或实体不存在时释放加载锁, 其他进程不必等到锁过期"""
+        try:
+            await get_redis().delete(LOCK_KEY_PREFIX + key + ":" + field)
+        except Exception:
+            logger.warning("entity cache unlock failed, key=%s", key, exc_info=True)
+
+    async def peek(self, model: Any, id: int, field: str) -> bytes | None:
+        """只读取缓存, 未命中时不回源"""
+        if not self.enabled:
+            return None
+        key = entity_key(model, id)
+        fields = self.local.get(key)
+        if fields is not None and field in fields:
+            return fields[field]
+        generation = self._generation
+        try:
+            value = await get_redis().hget(ENTITY_KEY_PREFIX + key, field)
+        except Exception:
+            logger.warning("entity cache unavailable, key=%s", key, exc_info=True)
+            return None
+        if value is not None:
+            self.redis_hits += 1
+            self._set_local(key, field, value, generation)
+        return value
+
+    async def get_many(
+        self, model: Any, ids: Sequence[int], field: str, load: ManyLoader
+    ) -> dict[int, bytes]:
+        """
+        批量读穿获取, 依次查询本地缓存, Redis(单次pipeline), 其余一次加载
+        批量加载不加锁, 与单个获取并发时可能重复回源
+        :param load: 未命中id的批量加载函数
+        """
+        if not self.enabled:
+            return await load(list(ids))
+        generation = self._generation
+        found: dict[int, bytes] = {}
+        for id in ids:
+            fields = self.local.get(entity_key(model, id))
+            if fields is not None and field in fields:
+                found[id] = fields[field]
+        pending = [id for id in ids if id not in found]
+        if not pending:
+            return found
+
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for id in pending:
+                    pipe.hget(ENTITY_KEY_PREFIX + entity_key(model, id), field)
+                    pipe.get(VERSION_KEY_PREFIX + entity_key(model, id))
+                results = await pipe.execute()
+        except Exception:
+            logger.warning("entity cache unavailable, model=%s", model, exc_info=True)
+            results = [None] * len(pending) * 2
+        values = results[0::2]
+        versions = dict(zip(pending, results[1::2]))
+        for id, value in zip(pending, values):
+            if value is not None:
+                self.redis_hits += 1
+                found[id] = value
+                self._set_local(entity_key(model, id), field, value, generation)
+        pending = [id for id in pending if id not in found]
+        if not pending:
+            return found
+
+        self.loads += len(pending)
+        loaded = await load(pending)
+        for id, value in loaded.items():
+            self._set_local(entity_key(model, id), field, value, generation)
+        found.update(loaded)
+        if not loaded:
+            return found
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for id, value in loaded.items():
+                    await self._set_shared(
+                        entity_key(model, id), field, value, versions[id], pipe
+                    )
+                await pipe.execute()
+        except Exception:
+            logger.warning("entity cache write failed, model=%s", model, exc_info=True)
+        return found
+
+    async def invalidate(self, model: Any, *ids: int | None) -> None:
+        """
+        写入后递增实体版本, 清除实体缓存并通知其他进程
+        版本比实体多保留一个过期周期, 覆盖过期前开始的回源
+        """
+        if not self.enabled:
+            return
+        keys = [entity_key(model, id) for id in ids if id is not None]
+        if not keys:
+            return
+        self._generation += 1
+        for key in keys:
+            self.local.pop(key)
+            self.missing.pop(key)
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                self._queue_invalidation(pipe, keys)
+                await pipe.execute()
+        except Exception:
+            logger.warning(
+                "entity cache invalidation failed, keys=%s", keys, exc_info=True
+            )
+
+    def invalidate_sync(self, model: Any, *ids: int | None) -> None:
+        """同步代码(如后台任务)绕过ORM写入后清除实体缓存并通知各进程"""
+        if not self.enabled:
+            return
+        keys = [entity_key(model, id) for id in ids if id is not None]
+        if not keys:
+            return
+        try:
+            with get_sync_redis().pipeline(transaction=False) as pipe:
+                self._queue_invalidation(pipe, keys)
+                pipe.execute()
+        except Exception:
+            logger.warning(
+                "entity cache invalidation failed, keys=%s", keys, exc_info=True
+            )
+
+    def _queue_invalidation(self, pipe: Any, keys: list[str]) -> None:
+        for key in keys:
+            pipe.incr(VERSION_KEY_PREFIX + key)
+            pipe.expire(VERSION_KEY_PREFIX + key, self.redis_ttl * 2)
+        pipe.delete(*(ENTITY_KEY_PREFIX + key for key in keys))
+        pipe.publish(INVALIDATE_CHANNEL, " ".join(keys))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with get_redis().pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATE_CHANNEL)
+                    # 订阅中断期间可能错过失效通知
+                    self._generation += 1
+                    self.local.clear()
+                    self.missing.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._generation += 1
+                            for key in message["data"].decode("utf-8").split():
+                                self.local.pop(key)
+                                self.missing.pop(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("entity cache subscription failed, retrying")
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        """启动失效订阅"""
+        if self.enabled:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """停止失效订阅"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        """缓存统计"""
+        return {
+            "enabled": self.enabled,
+            "local": self.local.stats(),
+            "missing": self.missing.stats(),
+            "redis_hits": self.redis_hits,
+            "loads": self.loads,
+        }
+
+
+entity_cache = EntityCache(
+    enabled=settings.entity_cache,
+    maxsize=settings.entity_cache_maxsize,
+    ttl=settings.entity_cache_ttl,
+    redis_ttl=settings.entity_cache_redis_ttl,
+    lock_timeout=settings.entity_cache_lock_timeout,
+    negative_ttl=settings.entity_cache_negative_ttl,
+)
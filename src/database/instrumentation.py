@@ -0,0 +1,89 @@
+"""
+SQL统计模块
+在引擎上注册游标事件, 按请求统计语句数, 数据库耗时以及相同形态语句的执行次数
+"""
+
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import Scope
+
+# IN (...) 展开后的参数列表, 归一为同一形态
+_PARAM_LIST = re.compile(
+    r"\(\s*(?:%\(\w+\)s|\$\d+|\?)(?:\s*,\s*(?:%\(\w+\)s|\$\d+|\?))*\s*\)"
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """语句形态: 合并空白并折叠展开的参数列表"""
+    return _WHITESPACE.sub(" ", _PARAM_LIST.sub("(?)", statement)).strip()
+
+
+class QueryStats:
+    """单个请求的SQL统计"""
+
+    def __init__(self, scope: Scope | None = None) -> None:
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        """记录一条语句"""
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """执行次数超过阈值的语句形态"""
+        if threshold <= 0:
+            return []
+        return [(s, n) for s, n in self.shapes.most_common() if n > threshold]
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头"""
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_route() -> str | None:
+    """当前请求匹配的路由, 如 GET /users/{user_id}"""
+    stats = query_stats.get()
+    if stats is None or stats.scope is None:
+        return None
+    route = stats.scope.get("route")
+    path = getattr(route, "path", None) or stats.scope.get("path")
+    return f"{stats.scope.get('method')} {path}"
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    if query_stats.get() is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    stats = query_stats.get()
+    start = getattr(context, "_query_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+def instrument_engine(engine: AsyncEngine | Engine) -> None:
+    """在引擎上注册统计事件, 重复调用无副作用"""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
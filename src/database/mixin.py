@@ -1,12 +1,20 @@
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Dict, Self, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Self, Sequence, Union
 
 from pydantic import BaseModel
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import Field, SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.database.bulk import (
+    BulkResult,
+    bulk_insert,
+    bulk_soft_delete,
+    bulk_update,
+)
+from src.database.entity_cache import entity_cache
 from src.database.exception import integrityError_exception
+from src.database.scope import active_scope
 
 if TYPE_CHECKING:
     from src.auth.models.user import User
@@ -44,23 +52,48 @@ class AuditMixin(SQLModel):
         default=None, foreign_key="user.id", title="删除用户"
     )
 
-    async def session_save(self, session: AsyncSession) -> Self:
+    async def session_save(
+        self, session: AsyncSession, refresh: Sequence[str] = ()
+    ) -> Self:
+        """
+        保存
+        服务端生成的列随 INSERT/UPDATE ... RETURNING 返回, 不再额外查询
+        :param refresh: 保存后需要加载的关系
+        """
+        refresh = [*refresh, *self.stale_relationships()]  # pyright: ignore
         try:
             session.add(self)
             await session.commit()
-            await session.refresh(self)
+            if refresh:
+                await session.refresh(self, attribute_names=refresh)
         except IntegrityError as e:
             await session.rollback()
             raise integrityError_exception(e.args[0]) from e
+        await self.invalidate_entities(session, [self.id])  # pyright: ignore
         return self
 
-    async def create(self, session: AsyncSession, current_user: "User") -> Self:
+    @classmethod
+    async def invalidate_entities(
+        cls, session: AsyncSession, ids: Sequence[int | None]
+    ) -> None:
+        """
+        写入后清除实体缓存
+        输出中嵌入了本实体的其他实体, 由子类覆盖时一并清除
+        """
+        await entity_cache.invalidate(cls, *ids)
+
+    async def create(
+        self,
+        session: AsyncSession,
+        current_user: "User",
+        refresh: Sequence[str] = (),
+    ) -> Self:
         """
         创建时设置创建用户, 更新用户
         """
         self.create_user_id = current_user.id
         self.update_user_id = current_user.id
-        return await self.session_save(session)
+        return await self.session_save(session, refresh)
 
     async def update(
         self,
@@ -85,6 +118,64 @@ class AuditMixin(SQLModel):
         await self.session_save(session)
         return None
 
+    @classmethod
+    async def bulk_create(
+        cls,
+        session: AsyncSession,
+        items: List[Union[Dict[str, Any], BaseModel]],
+        current_user: "User",
+    ) -> BulkResult:
+        """
+        批量创建, 设置创建用户, 更新用户
+        """
+        objs = [cls.model_validate(item) for item in items]
+        for obj in objs:
+            obj.create_user_id = current_user.id
+            obj.update_user_id = current_user.id
+        return await bulk_insert(session, cls, objs)  # pyright: ignore
+
+    @classmethod
+    async def bulk_update(
+        cls,
+        session: AsyncSession,
+        items: List[Dict[str, Any]],
+        current_user: "User",
+    ) -> BulkResult:
+        """
+        批量更新, 设置更新用户
+        """
+
+        def apply(obj: Self, data: Dict[str, Any]) -> None:
+            obj.update_user_id = current_user.id
+            obj.sqlmodel_update(data)
+
+        result = await bulk_update(session, cls, items, apply)  # pyright: ignore
+        await cls.invalidate_entities(
+            session, [item.id for item in result.items if item.ok]
+        )
+        return result
+
+    @classmethod
+    async def bulk_delete(
+        cls, session: AsyncSession, ids: List[int], current_user: "User"
+    ) -> BulkResult:
+        """
+        批量软删除, 设置删除用户, 删除时间
+        """
+        result = await bulk_soft_delete(
+            session,
+            cls,  # pyright: ignore
+            ids,
+            {"delete_user_id": current_user.id},
+        )
+        await cls.invalidate_entities(
+            session, [item.id for item in result.items if item.ok]
+        )
+        return result
+
+
+active_scope(AuditMixin)
+
 
 class AuditOutPutMixin(SQLModel):
     """
@@ -0,0 +1,81 @@
+"""
+分页模块
+列表接口默认按键排序的offset分页; 提供cursor时使用键集分页, 深分页与首页开销相同
+下一页游标通过响应头 X-Next-Cursor 返回
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Sequence, TypeVar
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlmodel.sql.expression import SelectOfScalar
+
+T = TypeVar("T")
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+invalid_cursor_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="无效的分页游标",
+)
+
+
+class Keyset:
+    """
+    键集分页定义
+    :param columns: 排序键, 如 (Task.id) 或 (Task.create_dt, Task.id), 最后一列需唯一
+    """
+
+    def __init__(self, *columns: Any) -> None:
+        self.columns: tuple[InstrumentedAttribute, ...] = columns
+
+    def encode(self, row: Any) -> str:
+        """根据行生成游标"""
+        values = [getattr(row, column.key) for column in self.columns]
+        raw = json.dumps(
+            [v.isoformat() if isinstance(v, datetime) else v for v in values]
+        )
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    def decode(self, cursor: str) -> list[Any]:
+        """解析游标"""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            if len(values) != len(self.columns):
+                raise ValueError(cursor)
+            return [
+                datetime.fromisoformat(v) if column.type.python_type is datetime else v
+                for column, v in zip(self.columns, values)
+            ]
+        except (ValueError, TypeError) as e:
+            raise invalid_cursor_exception from e
+
+    def paginate(
+        self,
+        stmt: SelectOfScalar[T],
+        offset: int,
+        limit: int,
+        cursor: str | None = None,
+    ) -> SelectOfScalar[T]:
+        """为查询添加稳定排序及分页条件"""
+        stmt = stmt.order_by(*self.columns)
+        if cursor:
+            values = self.decode(cursor)
+            if len(self.columns) == 1:
+                stmt = stmt.where(self.columns[0] > values[0])
+            else:
+                stmt = stmt.where(tuple_(*self.columns) > tuple_(*values))
+        else:
+            stmt = stmt.offset(offset)
+        return stmt.limit(limit)
+
+    def set_next_cursor(
+        self, response: Response, rows: Sequence[Any], limit: int
+    ) -> None:
+        """满页时在响应头中返回下一页游标"""
+        if rows and len(rows) >= limit:
+            response.headers[NEXT_CURSOR_HEADER] = self.encode(rows[-1])
@@ -0,0 +1,522 @@
+"""initial schema
+
+Revision ID: 9e403e8ee9b6
+Revises:
+Create Date: 2026-10-18 11:00:00.000000
+
+已有数据库(由 create_all 建表)执行 alembic stamp 9e403e8ee9b6 后再升级
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e403e8ee9b6"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "clocked_schedule",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("created_dt", sa.DateTime(), nullable=False),
+        sa.Column("updated_dt", sa.DateTime(), nullable=False),
+        sa.Column("clocked_time", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        comment="任务时钟定时定义表",
+    )
+    op.create_table(
+        "crontab_schedule",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("created_dt", sa.DateTime(), nullable=False),
+        sa.Column("updated_dt", sa.DateTime(), nullable=False),
+        sa.Column(
+            "minute", sqlmodel.sql.sqltypes.AutoString(length=240), nullable=False
+        ),
+        sa.Column("hour", sqlmodel.sql.sqltypes.AutoString(length=96), nullable=False),
+        sa.Column(
+            "day_of_week", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False
+        ),
+        sa.Column(
+            "day_of_month", sqlmodel.sql.sqltypes.AutoString(length=124), nullable=False
+        ),
+        sa.Column(
+            "month_of_year", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False
+        ),
+        sa.Column(
+            "timezone", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        comment="任务CRON定时定义表",
+    )
+    op.create_table(
+        "department",
+        sa.Column(
+            "name",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=False,
+            comment="部门名称",
+        ),
+        sa.Column(
+            "code",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=False,
+            comment="部门编码",
+        ),
+        sa.Column(
+            "active",
+            sa.Boolean(),
+            server_default="true",
+            nullable=False,
+            comment="是否有效: true有效,反之false",
+        ),
+        sa.Column("create_dt", sa.DateTime(), nullable=False, comment="创建时间"),
+        sa.Column("create_user_id", sa.Integer(), nullable=True, comment="创建用户"),
+        sa.Column("update_dt", sa.DateTime(), nullable=False, comment="更新时间"),
+        sa.Column("update_user_id", sa.Integer(), nullable=True, comment="更新用户"),
+        sa.Column("delete_dt", sa.DateTime(), nullable=True, comment="删除时间"),
+        sa.Column("delete_user_id", sa.Integer(), nullable=True, comment="删除用户"),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("code"),
+        sa.UniqueConstraint("name"),
+        comment="部门表",
+    )
+    op.create_table(
+        "interval_schedule",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("created_dt", sa.DateTime(), nullable=False),
+        sa.Column("updated_dt", sa.DateTime(), nullable=False),
+        sa.Column("every", sa.Integer(), nullable=False),
+        sa.Column(
+            "period",
+            sa.Enum(
+                "DAYS",
+                "HOURS",
+                "MINUTES",
+                "SECONDS",
+                "MICROSECONDS",
+                name="intervalperiod",
+            ),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        comment="任务周期定时定义表",
+    )
+    op.create_table(
+        "periodic_tasks_changed",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("last_update", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        comment="任务周期计划变更表",
+    )
+    op.create_table(
+        "solar_schedule",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("created_dt", sa.DateTime(), nullable=False),
+        sa.Column("updated_dt", sa.DateTime(), nullable=False),
+        sa.Column(
+            "event",
+            sa.Enum(
+                "DAWN_ASTRONOMICAL",
+                "DAWN_NAUTICAL",
+                "DAWN_CIVIL",
+                "SUNRISE",
+                "SOLAR_NOON",
+                "SUNSET",
+                "DUSK_CIVIL",
+                "DUSK_NAUTICAL",
+                "DUSK_ASTRONOMICAL",
+                name="solarevent",
+                create_constraint=True,
+            ),
+            nullable=True,
+        ),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        comment="任务周天文定时定义表",
+    )
+    op.create_table(
+        "user",
+        sa.Column(
+            "username",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=False,
+            comment="用户名",
+        ),
+        sa.Column("email", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("department_id", sa.Integer(), nullable=True, comment="所属部门"),
+        sa.Column(
+            "active",
+            sa.Boolean(),
+            server_default="true",
+            nullable=False,
+            comment="是否有效: true有效,反之false",
+        ),
+        sa.Column("create_dt", sa.DateTime(), nullable=False, comment="创建时间"),
+        sa.Column("update_dt", sa.DateTime(), nullable=False, comment="更新时间"),
+        sa.Column("delete_dt", sa.DateTime(), nullable=True, comment="删除时间"),
+        sa.Column(
+            "last_login_dt", sa.DateTime(), nullable=True, comment="最后登录时间"
+        ),
+        sa.Column(
+            "password_changed_dt",
+            sa.DateTime(),
+            nullable=True,
+            comment="密码最后修改时间",
+        ),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "hashed_password", sqlmodel.sql.sqltypes.AutoString(), nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["department_id"],
+            ["department.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("username"),
+        comment="用户表",
+    )
+    op.create_table(
+        "worker",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "hostname",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="工人主机名",
+        ),
+        sa.Column("freq", sa.Numeric(), nullable=True, comment="工人心跳频率(秒)"),
+        sa.Column("clock", sa.Integer(), nullable=True, comment="任务时钟"),
+        sa.Column("alive", sa.Boolean(), nullable=True, comment="工人是否存活"),
+        sa.Column("active", sa.Integer(), nullable=True, comment="活跃任务数"),
+        sa.Column("processed", sa.Integer(), nullable=True, comment="已处理任务数"),
+        sa.Column(
+            "sw_ident",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="工人标识",
+        ),
+        sa.Column(
+            "sw_ver",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="工人版本",
+        ),
+        sa.Column(
+            "sw_sys",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="工人系统",
+        ),
+        sa.Column("pid", sa.Integer(), nullable=True, comment="工人进程ID"),
+        sa.Column(
+            "timestamp", sa.DateTime(timezone=True), nullable=True, comment="工人时间戳"
+        ),
+        sa.Column(
+            "type",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="消息类型",
+        ),
+        sa.Column("utcoffset", sa.Integer(), nullable=True, comment="工人UTC偏移"),
+        sa.PrimaryKeyConstraint("id"),
+        comment="工人表",
+    )
+    op.create_table(
+        "periodic_task",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "name",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=False,
+            comment="计划名称",
+        ),
+        sa.Column(
+            "task",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=False,
+            comment="任务名称",
+        ),
+        sa.Column("args", sa.JSON(), nullable=True, comment="任务位置参数"),
+        sa.Column("kwargs", sa.JSON(), nullable=True, comment="任务关键字参数"),
+        sa.Column(
+            "queue",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务队列",
+        ),
+        sa.Column(
+            "exchange",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务交换机",
+        ),
+        sa.Column(
+            "routing_key",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务路由键",
+        ),
+        sa.Column("headers", sa.JSON(), nullable=True, comment="任务AMQP消息头"),
+        sa.Column("priority", sa.Integer(), nullable=True, comment="任务优先级"),
+        sa.Column(
+            "expires",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            comment="Datetime after which the schedule will no longer trigger the task to run",
+        ),
+        sa.Column(
+            "expire_seconds", sa.Integer(), nullable=True, comment="任务过期秒数"
+        ),
+        sa.Column("one_off", sa.Boolean(), nullable=True, comment="是否只运行一次"),
+        sa.Column(
+            "start_time",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            comment="任务开始时间",
+        ),
+        sa.Column("enabled", sa.Boolean(), nullable=True, comment="是否启用计划"),
+        sa.Column(
+            "last_run_at",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            comment="计划上次触发任务运行的日期时间",
+        ),
+        sa.Column(
+            "total_run_count", sa.Integer(), nullable=True, comment="任务运行次数"
+        ),
+        sa.Column(
+            "date_changed",
+            sa.DateTime(),
+            nullable=True,
+            comment="上次修改此PeriodicTask的日期",
+        ),
+        sa.Column(
+            "description",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务描述",
+        ),
+        sa.Column("no_changes", sa.Boolean(), nullable=False, comment="是否无变更"),
+        sa.Column("interval_id", sa.Integer(), nullable=True),
+        sa.Column("crontab_id", sa.Integer(), nullable=True),
+        sa.Column("solar_id", sa.Integer(), nullable=True),
+        sa.Column("clocked_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["clocked_id"],
+            ["clocked_schedule.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["crontab_id"],
+            ["crontab_schedule.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["interval_id"],
+            ["interval_schedule.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["solar_id"],
+            ["solar_schedule.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+        sa.UniqueConstraint("task"),
+        comment="任务周期计划表",
+    )
+    op.create_table(
+        "task",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("args", sa.JSON(), nullable=True, comment="任务位置参数"),
+        sa.Column(
+            "client",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务客户端",
+        ),
+        sa.Column("clock", sa.Integer(), nullable=True, comment="任务时钟"),
+        sa.Column(
+            "eta", sa.DateTime(timezone=True), nullable=True, comment="任务预计执行时间"
+        ),
+        sa.Column(
+            "exception",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务异常信息",
+        ),
+        sa.Column(
+            "exchange",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务交换机",
+        ),
+        sa.Column(
+            "expires", sa.DateTime(timezone=True), nullable=True, comment="任务过期时间"
+        ),
+        sa.Column(
+            "failed", sa.DateTime(timezone=True), nullable=True, comment="任务失败时间"
+        ),
+        sa.Column(
+            "hostname",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务主机名",
+        ),
+        sa.Column("kwargs", sa.JSON(), nullable=True, comment="任务关键字参数"),
+        sa.Column(
+            "local_received",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            comment="任务本地接收时间",
+        ),
+        sa.Column(
+            "name",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务名称",
+        ),
+        sa.Column("parent_id", sa.Uuid(), nullable=True, comment="任务父ID"),
+        sa.Column("pid", sa.Integer(), nullable=True, comment="任务进程ID"),
+        sa.Column(
+            "queue",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务队列",
+        ),
+        sa.Column("requeue", sa.Boolean(), nullable=True, comment="任务是否重新入队"),
+        sa.Column(
+            "received",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            comment="任务接收时间",
+        ),
+        sa.Column(
+            "rejected",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            comment="任务拒绝时间",
+        ),
+        sa.Column("result", sa.JSON(), nullable=True, comment="任务结果"),
+        sa.Column(
+            "retried", sa.DateTime(timezone=True), nullable=True, comment="任务重试时间"
+        ),
+        sa.Column("retries", sa.Integer(), nullable=True, comment="任务重试次数"),
+        sa.Column(
+            "revoked", sa.DateTime(timezone=True), nullable=True, comment="任务撤销时间"
+        ),
+        sa.Column("root_id", sa.Uuid(), nullable=True, comment="任务根ID"),
+        sa.Column(
+            "routing_key",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务路由键",
+        ),
+        sa.Column("runtime", sa.Numeric(), nullable=True, comment="任务运行时长(秒)"),
+        sa.Column(
+            "sent", sa.DateTime(timezone=True), nullable=True, comment="任务发送时间"
+        ),
+        sa.Column(
+            "started", sa.DateTime(timezone=True), nullable=True, comment="任务开始时间"
+        ),
+        sa.Column(
+            "state",
+            sa.Enum(
+                "PENDING",
+                "RECEIVED",
+                "STARTED",
+                "SUCCESS",
+                "FAILURE",
+                "REVOKED",
+                "REJECTED",
+                "RETRY",
+                name="taskstate",
+            ),
+            nullable=True,
+        ),
+        sa.Column(
+            "succeeded",
+            sa.DateTime(timezone=True),
+            nullable=True,
+            comment="任务是否成功",
+        ),
+        sa.Column(
+            "timestamp", sa.DateTime(timezone=True), nullable=True, comment="任务时间戳"
+        ),
+        sa.Column(
+            "traceback",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="任务堆栈跟踪信息",
+        ),
+        sa.Column(
+            "type",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+            comment="消息类型",
+        ),
+        sa.Column("utcoffset", sa.Integer(), nullable=True, comment="任务UTC偏移"),
+        sa.Column("uuid", sa.Uuid(), nullable=True, comment="任务UUID"),
+        sa.Column("worker_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["worker_id"],
+            ["worker.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("uuid"),
+        comment="任务表",
+    )
+    # 部门与用户互相引用, 用户表创建后再添加部门的用户外键
+    op.create_foreign_key(
+        "department_create_user_id_fkey",
+        "department",
+        "user",
+        ["create_user_id"],
+        ["id"],
+    )
+    op.create_foreign_key(
+        "department_update_user_id_fkey",
+        "department",
+        "user",
+        ["update_user_id"],
+        ["id"],
+    )
+    op.create_foreign_key(
+        "department_delete_user_id_fkey",
+        "department",
+        "user",
+        ["delete_user_id"],
+        ["id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("task")
+    op.drop_table("periodic_task")
+    op.drop_table("worker")
+    op.drop_constraint(
+        "department_create_user_id_fkey", "department", type_="foreignkey"
+    )
+    op.drop_constraint(
+        "department_update_user_id_fkey", "department", type_="foreignkey"
+    )
+    op.drop_constraint(
+        "department_delete_user_id_fkey", "department", type_="foreignkey"
+    )
+    op.drop_table("user")
+    op.drop_table("department")
+    op.drop_table("solar_schedule")
+    op.drop_table("periodic_tasks_changed")
+    op.drop_table("interval_schedule")
+    op.drop_table("crontab_schedule")
+    op.drop_table("clocked_schedule")
+    sa.Enum(name="taskstate").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="solarevent").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="intervalperiod").drop(op.get_bind(), checkfirst=True)
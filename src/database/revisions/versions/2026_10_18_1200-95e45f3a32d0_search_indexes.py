@@ -0,0 +1,69 @@
+"""search indexes
+
+Revision ID: 95e45f3a32d0
+Revises: 9e403e8ee9b6
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "95e45f3a32d0"
+down_revision: Union[str, None] = "9e403e8ee9b6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (索引名, 表名, 列名)
+TRGM_INDEXES = (
+    ("ix_user_username_trgm", "user", "username"),
+    ("ix_user_email_trgm", "user", "email"),
+    ("ix_department_name_trgm", "department", "name"),
+    ("ix_department_code_trgm", "department", "code"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # 并发建索引不锁表, 不能在事务中执行
+    with op.get_context().autocommit_block():
+        for name, table, column in TRGM_INDEXES:
+            op.create_index(
+                name,
+                table,
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        op.create_index(
+            "ix_user_department_id",
+            "user",
+            ["department_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_user_active",
+            "user",
+            ["id"],
+            postgresql_where=sa.text("active"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in (
+            "ix_user_active",
+            "ix_user_department_id",
+            *(name for name, _, _ in reversed(TRGM_INDEXES)),
+        ):
+            op.drop_index(name, postgresql_concurrently=True, if_exists=True)
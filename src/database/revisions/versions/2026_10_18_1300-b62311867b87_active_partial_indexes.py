@@ -0,0 +1,65 @@
+"""active partial indexes
+
+Revision ID: b62311867b87
+Revises: 95e45f3a32d0
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b62311867b87"
+down_revision: Union[str, None] = "95e45f3a32d0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (唯一约束名, 部分唯一索引名, 表名, 列名)
+UNIQUE_COLUMNS = (
+    ("user_username_key", "uq_user_username_active", "user", "username"),
+    ("department_name_key", "uq_department_name_active", "department", "name"),
+    ("department_code_key", "uq_department_code_active", "department", "code"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 并发建索引不锁表, 不能在事务中执行
+    with op.get_context().autocommit_block():
+        for _, index, table, column in UNIQUE_COLUMNS:
+            op.create_index(
+                index,
+                table,
+                [column],
+                unique=True,
+                postgresql_where=sa.text("active"),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        op.create_index(
+            "ix_department_active",
+            "department",
+            ["id"],
+            postgresql_where=sa.text("active"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    # 部分唯一索引建好后再删除包含已删除行的唯一约束
+    for constraint, _, table, _ in UNIQUE_COLUMNS:
+        op.drop_constraint(constraint, table, type_="unique")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 已删除行与有效行重名时无法恢复唯一约束, 需先清理数据
+    for constraint, _, table, column in UNIQUE_COLUMNS:
+        op.create_unique_constraint(constraint, table, [column])
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_department_active", postgresql_concurrently=True, if_exists=True
+        )
+        for _, index, _, _ in reversed(UNIQUE_COLUMNS):
+            op.drop_index(index, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""user security version
+
+Revision ID: 815532046edf
+Revises: b62311867b87
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "815532046edf"
+down_revision: Union[str, None] = "b62311867b87"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 带常量默认值的 NOT NULL 列只修改元数据, 不重写表
+    op.add_column(
+        "user",
+        sa.Column(
+            "security_version",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+            comment="安全版本: 用户名,部门,状态或密码变更时递增",
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("user", "security_version")
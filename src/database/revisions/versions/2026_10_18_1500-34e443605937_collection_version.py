@@ -0,0 +1,39 @@
+"""collection version
+
+Revision ID: 34e443605937
+Revises: 815532046edf
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "34e443605937"
+down_revision: Union[str, None] = "815532046edf"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "collection_version",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "name", sqlmodel.sql.sqltypes.AutoString(), nullable=False, comment="表名"
+        ),
+        sa.Column("version", sa.Integer(), nullable=False, comment="版本号"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+        comment="集合版本表",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("collection_version")
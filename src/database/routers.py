@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query
+
+from src.auth.models.auth import get_current_principal
+from src.database.collection import collection_cache
+from src.database.core import (
+    async_engine,
+    pool_status,
+    read_async_engine,
+    replica_monitor,
+)
+from src.database.entity_cache import entity_cache
+from src.database.slow_query import SlowQuery, slow_query_log
+
+database_router = APIRouter(
+    prefix="/database",
+    tags=["database"],
+    dependencies=[Depends(get_current_principal)],
+)
+
+
+@database_router.get("/pool")
+async def read_pool_status():
+    """获取连接池状态"""
+    return {
+        "primary": pool_status(async_engine),
+        "replica": (
+            pool_status(read_async_engine)
+            if read_async_engine is not async_engine
+            else None
+        ),
+        "replica_lag": replica_monitor.lag,
+    }
+
+
+@database_router.get("/entity_cache")
+async def read_entity_cache_stats():
+    """获取实体缓存统计"""
+    return entity_cache.stats()
+
+
+@database_router.get("/collection_cache")
+async def read_collection_cache_stats():
+    """获取列表响应缓存统计"""
+    return collection_cache.stats()
+
+
+@database_router.get("/slow_queries", response_model=list[SlowQuery])
+async def read_slow_queries(limit: int = Query(default=50, le=500)):
+    """获取最近的慢查询, 最新的在前"""
+    return slow_query_log.entries(limit)
+
+
+@database_router.delete("/slow_queries")
+async def clear_slow_queries():
+    """清空慢查询记录"""
+    slow_query_log.clear()
+    return {"ok": True}
@@ -0,0 +1,62 @@
+"""
+软删除作用域模块
+注册的模型默认只查询有效行(active), 语句执行选项 include_deleted=True 时包含已删除行;
+集合关系加载沿用父查询的条件, 多对一引用(如审计人、所属部门)即使已删除也加载, 列刷新不受影响
+"""
+
+from typing import Any, TypeVar
+
+from fastapi import Query
+from sqlalchemy.event import listen
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+from sqlalchemy.sql import Executable
+
+E = TypeVar("E", bound=Executable)
+
+INCLUDE_DELETED = "include_deleted"
+
+include_deleted_query = Query(
+    default=False, alias=INCLUDE_DELETED, description="是否包含已删除的行"
+)
+
+# 注册模型的查询条件, 模型可以是映射类或其混入类
+criteria: list[Any] = []
+
+
+def active_scope(*models: Any) -> None:
+    """注册默认只查询有效行的模型"""
+    for model in models:
+        criteria.append(
+            with_loader_criteria(model, lambda cls: cls.active, include_aliases=True)
+        )
+
+
+def include_deleted(stmt: E, include: bool = True) -> E:
+    """设置语句是否包含已删除行"""
+    return stmt.execution_options(**{INCLUDE_DELETED: include})
+
+
+def _without_criteria(stmt: E) -> E:
+    """移除语句中的有效行条件"""
+    stmt = stmt._generate()
+    stmt._with_options = tuple(
+        opt for opt in stmt._with_options if not any(opt is c for c in criteria)
+    )
+    return stmt
+
+
+def apply_active_scope(state: ORMExecuteState) -> None:
+    """为查询添加有效行条件"""
+    if not state.is_select or state.is_column_load:
+        return
+    if state.is_relationship_load:
+        # selectin加载会复制父查询的全部选项, 先移除条件, 多对一引用不再添加
+        state.statement = _without_criteria(state.statement)
+        if not getattr(state.loader_strategy_path[-1], "uselist", True):
+            return
+    if state.execution_options.get(INCLUDE_DELETED, False):
+        return
+    state.statement = state.statement.options(*criteria)
+
+
+listen(Session, "do_orm_execute", apply_active_scope)
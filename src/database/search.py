@@ -0,0 +1,42 @@
+"""
+搜索模块
+列表接口的过滤条件: 字符串字段按前缀或子串 ILIKE 匹配(由pg_trgm GIN索引支持), 其余字段等值匹配
+"""
+
+from typing import Any, Literal
+
+from sqlmodel import SQLModel, col
+
+# 字符串匹配方式: 前缀, 子串
+SearchMatch = Literal["prefix", "contains"]
+
+
+def escape_like(value: str) -> str:
+    """转义LIKE通配符"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SearchBase(SQLModel):
+    """搜索模型基类, 未提供的字段不参与过滤"""
+
+    match: SearchMatch = "contains"
+
+    def conditions(self, model: Any) -> list[Any]:
+        """生成过滤条件"""
+        conditions = []
+        for name, value in self.model_dump(
+            exclude_none=True, exclude={"match"}
+        ).items():
+            column = col(getattr(model, name))
+            if isinstance(value, str):
+                pattern = escape_like(value) + "%"
+                if self.match == "contains":
+                    pattern = "%" + pattern
+                conditions.append(column.ilike(pattern, escape="\\"))
+            else:
+                conditions.append(column == value)
+        return conditions
+
+    def include_deleted(self, deleted: bool) -> bool:
+        """是否包含已删除行, 按 active=false 搜索时必须包含"""
+        return deleted or getattr(self, "active", None) is False
@@ -0,0 +1,192 @@
+"""
+慢查询日志模块
+超过阈值的语句记录到环形缓冲区(参数脱敏), 并按采样比例执行 EXPLAIN (FORMAT JSON) 记录执行计划
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import deque
+from datetime import date, datetime
+from threading import Lock
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel
+
+from src.config import settings
+from src.database.instrumentation import current_route
+
+logger = logging.getLogger(__name__)
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+REDACTED = "***"
+EXPLAIN_SAVEPOINT = "slow_query_explain"
+
+
+class SlowQuery(SQLModel):
+    """慢查询记录"""
+
+    at: datetime
+    source: str | None
+    statement: str
+    parameters: Any
+    duration_ms: float
+    plan: Any | None = None
+
+
+def redact(parameters: Any) -> Any:
+    """参数脱敏, 仅保留数字, 布尔, 时间和空值"""
+    if isinstance(parameters, dict):
+        return {k: redact(v) for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(v) for v in parameters]
+    if parameters is None or isinstance(parameters, (bool, int, float, date)):
+        return parameters
+    return REDACTED
+
+
+def caller() -> str | None:
+    """
+    语句来源
+    请求内为路由, 否则为调用栈中第一个项目代码函数(如调度器方法)
+    """
+    route = current_route()
+    if route is not None:
+        return route
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(SRC_DIR) and filename != __file__:
+            self = frame.f_locals.get("self")
+            name = frame.f_code.co_name
+            if self is not None:
+                return f"{type(self).__name__}.{name}"
+            return f"{frame.f_globals.get('__name__')}.{name}"
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog:
+    """慢查询环形缓冲区"""
+
+    def __init__(self, maxlen: int, threshold_ms: float, sample_rate: float) -> None:
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self._entries: deque[SlowQuery] = deque(maxlen=maxlen)
+        self._lock = Lock()
+
+    def entries(self, limit: int | None = None) -> list[SlowQuery]:
+        """最近的慢查询, 最新的在前"""
+        with self._lock:
+            entries = list(reversed(self._entries))
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self) -> None:
+        """清空记录"""
+        with self._lock:
+            self._entries.clear()
+
+    def explain(self, conn: Any, statement: str, parameters: Any) -> Any:
+        """
+        在同一连接上获取执行计划, 不实际执行语句
+        事务中以保存点包裹, EXPLAIN 失败时回滚到保存点, 不中止调用方的事务
+        """
+        savepoint = not getattr(conn.connection.dbapi_connection, "autocommit", False)
+        cursor = conn.connection.cursor()
+        try:
+            if savepoint:
+                cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            try:
+                cursor.execute(
+                    f"EXPLAIN (ANALYZE off, FORMAT JSON) {statement}", parameters
+                )
+                plan = cursor.fetchone()[0]
+            except Exception:
+                if savepoint:
+                    cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+                raise
+            if savepoint:
+                cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            return json.loads(plan) if isinstance(plan, str) else plan
+        finally:
+            cursor.close()
+
+    def _before_cursor_execute(
+        self,
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        many: bool,
+    ) -> None:
+        context._slow_query_start = time.perf_counter()
+
+    def _after_cursor_execute(
+        self,
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        many: bool,
+    ) -> None:
+        start = getattr(context, "_slow_query_start", None)
+        if start is None:
+            return
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        entry = SlowQuery(
+            at=datetime.now(),
+            source=caller(),
+            statement=statement,
+            parameters=redact(parameters),
+            duration_ms=round(duration_ms, 1),
+        )
+        if (
+            not many
+            and conn.dialect.name == "postgresql"
+            and statement.lstrip().upper().startswith(EXPLAINABLE)
+            and random.random() < self.sample_rate
+        ):
+            try:
+                entry.plan = self.explain(conn, statement, parameters)
+            except Exception:
+                logger.warning("explain failed: %s", statement, exc_info=True)
+        with self._lock:
+            self._entries.append(entry)
+        logger.warning(
+            "slow query %.1fms from %s: %s",
+            entry.duration_ms,
+            entry.source,
+            statement,
+            extra={"duration_ms": entry.duration_ms, "source": entry.source},
+        )
+
+    def install(self, engine: AsyncEngine | Engine) -> None:
+        """在引擎上注册慢查询记录, 重复调用无副作用"""
+        sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        if not event.contains(
+            sync_engine, "before_cursor_execute", self._before_cursor_execute
+        ):
+            event.listen(
+                sync_engine, "before_cursor_execute", self._before_cursor_execute
+            )
+            event.listen(
+                sync_engine, "after_cursor_execute", self._after_cursor_execute
+            )
+
+
+slow_query_log = SlowQueryLog(
+    maxlen=settings.slow_query_buffer_size,
+    threshold_ms=settings.slow_query_threshold_ms,
+    sample_rate=settings.slow_query_explain_sample_rate,
+)
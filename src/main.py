@@ -1,22 +1,61 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import ValidationError
 
+from src.auth.password import password_hasher
+from src.auth.revocation import token_revocation
+from src.config import settings
+from src.database.core import async_engine, read_async_engine, warm_up_pool
+from src.database.entity_cache import entity_cache
+from src.database.instrumentation import instrument_engine
+from src.database.pagination import NEXT_CURSOR_HEADER
+from src.database.slow_query import slow_query_log
 from src.exceptions import validation_exception_handler
+from src.middlewares import QueryStatsMiddleware
+from src.responses import response_class
 
 from .api import api_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    """应用生命周期"""
+    if settings.db_pool_warmup:
+        await warm_up_pool(async_engine, settings.db_pool_warmup)
+    await token_revocation.start()
+    await entity_cache.start()
+    yield
+    await entity_cache.stop()
+    await token_revocation.stop()
+    password_hasher.shutdown()
+
+
+middleware = [
+    Middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing", "ETag"],
+    ),
+]
+if settings.sql_instrumentation:
+    instrument_engine(async_engine)
+    instrument_engine(read_async_engine)
+    middleware.append(Middleware(QueryStatsMiddleware))
+if settings.slow_query_log:
+    slow_query_log.install(async_engine)
+    slow_query_log.install(read_async_engine)
+
 app = FastAPI(
-    middleware=[
-        Middleware(
-            CORSMiddleware,
-            allow_origins=["*"],
-            allow_methods=["*"],
-            allow_headers=["*"],
-        ),
-    ],
+    lifespan=lifespan,
+    middleware=middleware,
+    default_response_class=response_class(),
     exception_handlers={
         ValidationError: validation_exception_handler,
     },
@@ -0,0 +1,77 @@
+"""
+中间件模块
+"""
+
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import settings
+from src.database.instrumentation import QueryStats, query_stats
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware:
+    """
+    请求SQL统计中间件
+    通过 Server-Timing 响应头返回数据库耗时, 记录结构化日志, 同一语句形态重复执行过多时告警
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = query_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_stats.reset(token)
+            self.log(scope, status_code, stats, time.perf_counter() - start)
+
+    @staticmethod
+    def log(scope: Scope, status_code: int, stats: QueryStats, seconds: float) -> None:
+        extra = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status_code": status_code,
+            "duration_ms": round(seconds * 1000, 1),
+            "db_queries": stats.count,
+            "db_ms": round(stats.seconds * 1000, 1),
+        }
+        logger.info(
+            "%s %s %s queries=%d db_ms=%.1f",
+            extra["method"],
+            extra["path"],
+            status_code,
+            stats.count,
+            extra["db_ms"],
+            extra=extra,
+        )
+        for shape, count in stats.repeated(settings.sql_repeat_threshold):
+            logger.warning(
+                "possible N+1: %s %s ran the same statement %d times: %s",
+                extra["method"],
+                extra["path"],
+                count,
+                shape,
+                extra={**extra, "statement": shape, "repeat": count},
+            )
@@ -0,0 +1,77 @@
+"""
+响应模块
+默认响应类使用orjson编码; 列表接口可返回 ModelResponse, 由预构建的TypeAdapter一次性校验ORM对象并直接编码,
+省去FastAPI先转换为JSON兼容对象再编码的步骤
+"""
+
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any, Generic, TypeVar
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+from src.config import settings
+
+T = TypeVar("T")
+
+
+def response_class() -> type[Response]:
+    """根据配置选择默认响应类"""
+    return ORJSONResponse if settings.response_class == "orjson" else JSONResponse
+
+
+@lru_cache(maxsize=None)
+def type_adapter(schema: Any) -> TypeAdapter[Any]:
+    """按输出类型缓存的TypeAdapter, 避免重复构建校验器"""
+    return TypeAdapter(schema)
+
+
+def serialize(schema: Any, data: Any) -> bytes:
+    """
+    将ORM对象校验为输出模型并使用orjson编码
+    :param schema: 输出类型, 如 list[UserOut]
+    """
+    adapter = type_adapter(schema)
+    return orjson.dumps(
+        adapter.dump_python(adapter.validate_python(data, from_attributes=True)),
+        option=orjson.OPT_NON_STR_KEYS,
+    )
+
+
+class Batch(BaseModel, Generic[T]):
+    """按id批量获取的结果, 按请求顺序排列"""
+
+    items: list[T]
+    missing: list[int]
+
+
+def batch_response(ids: Sequence[int], found: dict[int, bytes]) -> Response:
+    """
+    由已序列化的实体拼接批量获取响应, 不再重复序列化
+    :param ids: 请求的id, 已去重
+    :param found: 已获取的实体
+    """
+    items = b",".join(found[id] for id in ids if id in found)
+    missing = orjson.dumps([id for id in ids if id not in found])
+    return Response(
+        b'{"items":[' + items + b'],"missing":' + missing + b"}",
+        media_type="application/json",
+    )
+
+
+class ModelResponse(Response):
+    """
+    按输出类型序列化的JSON响应
+    :param schema: 输出类型, 应与路由的response_model一致
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, schema: Any, content: Any, **kwargs: Any) -> None:
+        self.schema = schema
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return serialize(self.schema, content)
@@ -1,26 +1,38 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlmodel import select
 
-from src.auth.models.auth import get_current_user
+from src.auth.models.auth import get_current_principal, get_current_user
 from src.auth.models.user import User
-from src.database.core import SessionDep
+from src.database.core import ReadSessionDep, SessionDep
+from src.database.pagination import Keyset
 from src.workflow.models.scheduler import PeriodicTask
 
 periodic_task_router = APIRouter(
     prefix="/periodic_task_",
     tags=["periodic_task"],
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
 
+periodic_task_keyset = Keyset(PeriodicTask.id)
+
 
 @periodic_task_router.get("/", response_model=list[PeriodicTask])
 async def read_periodic_tasks(
-    session: SessionDep,
+    response: Response,
+    session: ReadSessionDep,
     offset: int = 0,
     limit: int = Query(default=100, le=100),
+    cursor: str | None = Query(default=None, description="键集分页游标"),
 ):
-    roles = (await session.exec(select(PeriodicTask).offset(offset).limit(limit))).all()
-    return roles
+    stmt = periodic_task_keyset.paginate(
+        select(PeriodicTask).options(*PeriodicTask.load_options(PeriodicTask)),
+        offset,
+        limit,
+        cursor,
+    )
+    periodic_tasks = (await session.exec(stmt)).all()
+    periodic_task_keyset.set_next_cursor(response, periodic_tasks, limit)
+    return periodic_tasks
 
 
 @periodic_task_router.post("/", response_model=PeriodicTask)
@@ -1,22 +1,47 @@
-from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, Response
 from sqlmodel import select
 
-from src.auth.models.auth import get_current_user
-from src.database.core import SessionDep
+from src.auth.models.auth import get_current_principal
+from src.database.core import ReadSessionDep
+from src.database.export import Exporter, ExportFormat
+from src.database.pagination import Keyset
 from src.workflow.models.task import Task
 
 task_router = APIRouter(
     prefix="/task",
     tags=["task"],
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
 
+task_keyset = Keyset(Task.id)
+# 任务表没有update_dt, 使用事件时间戳作为增量依据
+task_exporter = Exporter(Task, Task, Task.timestamp)
+
 
 @task_router.get("/", response_model=list[Task])
 async def read_tasks(
-    session: SessionDep,
+    response: Response,
+    session: ReadSessionDep,
     offset: int = 0,
     limit: int = Query(default=100, le=100),
+    cursor: str | None = Query(default=None, description="键集分页游标"),
+):
+    stmt = task_keyset.paginate(
+        select(Task).options(*Task.load_options(Task)), offset, limit, cursor
+    )
+    tasks = (await session.exec(stmt)).all()
+    task_keyset.set_next_cursor(response, tasks, limit)
+    return tasks
+
+
+@task_router.get("/export")
+async def export_tasks(
+    format: ExportFormat = "ndjson",
+    since: datetime | None = Query(
+        default=None, description="仅导出该时间之后有事件的任务"
+    ),
 ):
-    roles = (await session.exec(select(Task).offset(offset).limit(limit))).all()
-    return roles
+    """流式导出任务"""
+    return task_exporter.response(select(Task), format, since)
@@ -13,6 +13,8 @@ from kombu.utils.encoding import safe_repr, safe_str
 from kombu.utils.json import loads
 from sqlmodel import Session, create_engine, select
 
+from src.config import settings
+from src.database.slow_query import slow_query_log
 from src.workflow.models.scheduler import (
     ClockedSchedule,
     CrontabSchedule,
@@ -218,6 +220,8 @@ class DatabaseScheduler(Scheduler):
         self.app = kwargs.get("app") or current_app._get_current_object()
         self.dburi = dburi or self.app.conf.beat_dburi
         self.engine = create_engine(self.dburi)
+        if settings.slow_query_log:
+            slow_query_log.install(self.engine)
         Scheduler.__init__(self, *args, **kwargs)
         self._finalize = Finalize(self, self.sync, exitpriority=5)
         self.max_interval = (